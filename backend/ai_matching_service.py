@@ -7,23 +7,43 @@ Implémentation des fonctionnalités IA avancées selon les spécifications PDF
 
 import os
 import json
-import random
+import bisect
+import functools
 import sqlite3
 import logging
+import threading
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
-from pydantic import BaseModel
+from typing import List, Dict, NamedTuple, Optional, Tuple
+from dataclasses import dataclass, field
+from pydantic import BaseModel, ConfigDict, field_validator
+import numpy as np
 import re
-import math
+
+from sqlite_pool import SQLitePool
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel: repli sur le module json standard
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Générateur aléatoire partagé pour les parties simulées (tirages groupés)
+_RNG = np.random.default_rng()
+
+# Sujets génériques maritimes proposés en complément des sujets spécifiques
+GENERIC_CONVERSATION_TOPICS = (
+    "Innovations technologiques maritimes",
+    "Réglementations internationales récentes",
+    "Tendances du marché portuaire",
+    "Projets de développement durable"
+)
+
 # =============================================================================
 # MODÈLES DE DONNÉES
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class UserProfile:
     """Profil utilisateur complet selon spécifications PDF"""
     user_id: int
@@ -39,43 +59,70 @@ class UserProfile:
     description: str
     
     # Spécifique selon type d'utilisateur
-    sectors_activity: List[str] = None  # Secteurs d'activité
-    products_services: List[str] = None  # Produits/services proposés
-    participation_objectives: List[str] = None  # Objectifs de participation
-    interest_themes: List[str] = None  # Thématiques d'intérêt
-    visit_objectives: List[str] = None  # Objectifs de visite (visiteurs)
-    skills_expertise: List[str] = None  # Compétences et expertises
+    sectors_activity: List[str] = field(default_factory=list)  # Secteurs d'activité
+    products_services: List[str] = field(default_factory=list)  # Produits/services proposés
+    participation_objectives: List[str] = field(default_factory=list)  # Objectifs de participation
+    interest_themes: List[str] = field(default_factory=list)  # Thématiques d'intérêt
+    visit_objectives: List[str] = field(default_factory=list)  # Objectifs de visite (visiteurs)
+    skills_expertise: List[str] = field(default_factory=list)  # Compétences et expertises
     
     # Critères de matching personnalisables
-    matching_criteria: Dict = None
-    looking_for: List[str] = None
+    matching_criteria: Dict = field(default_factory=dict)
+    looking_for: List[str] = field(default_factory=list)
     budget_range: str = None
     company_size: str = None
-    geographic_location: List[str] = None
+    geographic_location: List[str] = field(default_factory=list)
     
     # Données comportementales (pour IA)
-    interaction_history: List[Dict] = None
-    preferences: Dict = None
+    interaction_history: List[Dict] = field(default_factory=list)
+    preferences: Dict = field(default_factory=dict)
     meeting_availability: str = None
-    languages: List[str] = None
-    certifications: List[str] = None
+    languages: List[str] = field(default_factory=list)
+    certifications: List[str] = field(default_factory=list)
+
+
+# Valeurs acceptées pour MatchingRequest.match_types (types d'utilisateur de la table users)
+MATCH_TYPES = frozenset({"all", "visitor", "exhibitor", "partner"})
 
 
 class MatchingRequest(BaseModel):
-    """Requête de matching avec critères"""
+    """Requête de matching avec critères (immuable, défauts partagés)"""
+    model_config = ConfigDict(frozen=True)
+    
     user_id: int
-    match_types: List[str] = ["all"]  # partners, exhibitors, visitors, all
-    sectors: List[str] = ["all"]
+    match_types: Tuple[str, ...] = ("all",)  # partners, exhibitors, visitors, all
+    sectors: Tuple[str, ...] = ("all",)
     min_compatibility: int = 70
-    location_filter: List[str] = ["all"]
-    package_filter: List[str] = ["all"]
+    location_filter: Tuple[str, ...] = ("all",)
+    package_filter: Tuple[str, ...] = ("all",)
     budget_filter: str = "all"
-    custom_criteria: Dict = {}
+    custom_criteria: Optional[Dict] = None
     limit: int = 20
 
+    @field_validator("match_types")
+    @classmethod
+    def _known_match_types(cls, match_types: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Types dédoublonnés (un paramètre SQL par type) ; valeur inconnue refusée"""
+        unknown = set(match_types) - MATCH_TYPES
+        if unknown:
+            raise ValueError(f"Types de match inconnus: {', '.join(sorted(unknown))}")
+        return tuple(dict.fromkeys(match_types))
+
+
+class MatchSummary(NamedTuple):
+    """Textes de synthèse d'un match"""
+    explanation: str
+    business_potential: str
+    ai_recommendation: str
 
-class MatchResult(BaseModel):
-    """Résultat de matching avec score IA"""
+
+@dataclass(slots=True)
+class MatchResult:
+    """Résultat de matching avec score IA
+
+    Construit uniquement par le service à partir de valeurs déjà typées, et
+    seulement pour les matches retenus après la sélection top-K.
+    """
     matched_user_id: int
     compatibility_score: int
     explanation: str
@@ -87,7 +134,7 @@ class MatchResult(BaseModel):
 
 
 class ProactiveRecommendation(BaseModel):
-    """Suggestion proactive par l'IA"""
+    """Suggestion proactive par l'IA (construite via `model_construct`, sans revalidation)"""
     user_id: int
     recommendation_type: str  # new_match, trending_topic, opportunity
     title: str
@@ -96,6 +143,375 @@ class ProactiveRecommendation(BaseModel):
     action_suggestions: List[str]
     expires_at: datetime
 
+# =============================================================================
+# INDEX DE PROFILS (STRUCT-OF-ARRAYS)
+# =============================================================================
+
+if orjson is not None:
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+else:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+
+def _json_list(value) -> List:
+    """Décodage d'une colonne JSON de type liste (NULL/vide -> liste vide)"""
+    return _json_loads(value) if value else []
+
+
+def _profile_view(profile) -> Dict:
+    """Vue d'un profil (ligne SQLite ou dict) dont les colonnes JSON sont décodées une seule fois
+
+    Les `sqlite3.Row` sont lus directement par nom de colonne, sans copie en dict.
+    """
+    if isinstance(profile, sqlite3.Row):
+        columns = profile.keys()
+        
+        def get(key, default=None):
+            return profile[key] if key in columns else default
+    else:
+        get = profile.get
+    view = {
+        'id': get('id'),
+        'description': get('description', ''),
+        'sectors': tuple(_json_list(get('sectors_activity'))),
+        'themes': tuple(_json_list(get('interest_themes'))),
+        'geo': tuple(_json_list(get('geographic_location'))),
+        'objectives': tuple(_json_list(get('participation_objectives'))),
+        'looking_for': tuple(_json_list(get('looking_for'))),
+        'products': tuple(_json_list(get('products_services'))),
+        'size': get('company_size') or '',
+        'availability': (get('meeting_availability') or '').lower(),
+    }
+    # Formes normalisées du facteur de complémentarité, préparées une fois par profil
+    view['objective_words'] = tuple(_words(objective) for objective in view['objectives'])
+    view['products_lower'] = tuple(_lower(product) for product in view['products'])
+    return view
+
+
+@functools.lru_cache(maxsize=100_000)
+def _lower(text: str) -> str:
+    """Libellé en minuscules, mémoïsé (les mêmes libellés reviennent à chaque paire)"""
+    return text.lower()
+
+
+@functools.lru_cache(maxsize=100_000)
+def _words(text: str) -> Tuple[str, ...]:
+    """Mots en minuscules d'un libellé, mémoïsés"""
+    return tuple(text.lower().split())
+
+
+# Nombre de bits à 1 de chaque octet (popcount par table de correspondance)
+_POPCOUNT8 = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+if hasattr(np, 'bitwise_count'):
+    # NumPy >= 2: popcount natif (instruction POPCNT lorsque disponible)
+    _popcount = np.bitwise_count
+else:
+    def _popcount(bits: np.ndarray) -> np.ndarray:
+        return _POPCOUNT8[bits]
+
+
+class ProfileIndex:
+    """Index colonnaire des champs liste d'un pool de candidats
+
+    Chaque champ est encodé une seule fois en masques de bits (un bit par terme du
+    vocabulaire, `np.packbits`), ce qui ramène le recouvrement avec le profil
+    demandeur à un ET binaire suivi d'un popcount, pour tout le pool à la fois.
+    """
+
+    FIELDS = ('sectors', 'themes', 'geo')
+
+    def __init__(self, profiles: List[Dict]):
+        """`profiles`: vues produites par `_profile_view`"""
+        self.size = len(profiles)
+        self.vocab: Dict[str, Dict[str, int]] = {}
+        self.bitsets: Dict[str, np.ndarray] = {}
+
+        for column in self.FIELDS:
+            vocab: Dict[str, int] = {}
+            term_ids = [
+                [vocab.setdefault(term, len(vocab)) for term in profile[column]]
+                for profile in profiles
+            ]
+            matrix = np.zeros((self.size, len(vocab)), dtype=np.uint8)
+            for row, ids in enumerate(term_ids):
+                matrix[row, ids] = 1
+            self.vocab[column] = vocab
+            self.bitsets[column] = np.packbits(matrix, axis=1)
+
+    def mask(self, column: str, terms: List[str]) -> np.ndarray:
+        """Masque de bits de `terms` dans le vocabulaire de la colonne"""
+        vocab = self.vocab[column]
+        bits = np.zeros(len(vocab), dtype=np.uint8)
+        bits[[vocab[term] for term in set(terms) if term in vocab]] = 1
+        return np.packbits(bits)
+
+    def overlap(self, column: str, terms: List[str]) -> np.ndarray:
+        """Nombre de termes distincts communs entre `terms` et chaque candidat"""
+        common = self.bitsets[column] & self.mask(column, terms)
+        return _popcount(common).sum(axis=1, dtype=np.int32)
+
+# Catégories de taille reconnues (présence du mot-clé dans company_size)
+SIZE_CATEGORIES = ("startup", "sme", "enterprise")
+
+# Logique de compatibilité des tailles d'entreprise (première paire reconnue)
+SIZE_COMPATIBILITY = (
+    (("startup", "enterprise"), 8),
+    (("sme", "enterprise"), 10),
+    (("sme", "sme"), 10),
+    (("startup", "startup"), 7),
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def _size_code(company_size: Optional[str]) -> int:
+    """Code binaire des catégories de taille présentes dans la valeur (0 si vide)"""
+    size = (company_size or '').lower()
+    return sum(1 << bit for bit, category in enumerate(SIZE_CATEGORIES) if category in size)
+
+
+def _build_size_points() -> np.ndarray:
+    """Table des points de taille indexée par (code utilisateur, code candidat)"""
+    bits = {category: 1 << bit for bit, category in enumerate(SIZE_CATEGORIES)}
+    size = 1 << len(SIZE_CATEGORIES)
+    table = np.zeros((size, size), dtype=np.int32)
+    for code1 in range(1, size):
+        for code2 in range(1, size):
+            for (s1, s2), points in SIZE_COMPATIBILITY:
+                if (code1 & bits[s1] and code2 & bits[s2]) or (code1 & bits[s2] and code2 & bits[s1]):
+                    table[code1, code2] = points
+                    break
+    return table
+
+
+_SIZE_POINTS = _build_size_points()
+
+
+# Tranches de score des synthèses de match (< 70, 70-79, 80-89, >= 90)
+SCORE_BANDS = (70, 80, 90)
+MATCH_TONES = (
+    "Compatibilité modérée",
+    "Bonne compatibilité",
+    "Très bonne compatibilité",
+    "Correspondance exceptionnelle",
+)
+
+# Potentiel business indexé par (tranche de score, besoins complémentaires >= 2, alignement fort)
+_BUSINESS_POTENTIAL = (
+    (("Faible", "Faible"), ("Faible", "Faible")),
+    (("Moyen", "Moyen"), ("Moyen", "Moyen")),
+    (("Moyen", "Élevé"), ("Moyen", "Élevé")),
+    (("Moyen", "Élevé"), ("Très élevé", "Très élevé")),
+)
+
+
+def _aggregate_scores(sectors: np.ndarray, complementarity: np.ndarray, themes: np.ndarray,
+                      geo: np.ndarray, size_points: np.ndarray, availability_points: np.ndarray) -> np.ndarray:
+    """Barème du modèle de compatibilité, appliqué à des colonnes de facteurs (un élément par candidat)"""
+    score = np.minimum(25, sectors * 8)             # Facteur 1: secteurs communs (25 points)
+    score += np.minimum(20, complementarity * 4)    # Facteur 2: objectifs complémentaires (20 points)
+    score += np.minimum(20, themes * 5)             # Facteur 3: thématiques communes (20 points)
+    score += np.where(geo > 0, 15, 0)               # Facteur 4: proximité géographique (15 points)
+    score += size_points                            # Facteur 5: taille d'entreprise (10 points)
+    score += availability_points                    # Facteur 6: disponibilité (10 points)
+    return np.minimum(100, score)
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices des k meilleurs scores, par score décroissant (ordre d'origine en cas d'égalité)"""
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(scores):
+        kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+        pool = np.flatnonzero(scores >= kth)
+    else:
+        pool = np.arange(len(scores))
+    return pool[np.argsort(-scores[pool], kind='stable')][:k]
+
+
+# Durée de validité des recommandations proactives par type
+RECOMMENDATION_TTL = {
+    "trending_topic": timedelta(days=7),
+    "new_match": timedelta(days=3),
+}
+
+# Colonnes lues par le scoring (users u LEFT JOIN user_profiles_detailed upd)
+PROFILE_COLUMNS = """
+    u.id, upd.sectors_activity, upd.interest_themes, upd.geographic_location,
+    upd.participation_objectives, upd.looking_for, upd.products_services,
+    upd.company_size, upd.meeting_availability
+"""
+
+PROFILE_SQL = f'''
+    SELECT {PROFILE_COLUMNS}
+    FROM users u
+    LEFT JOIN user_profiles_detailed upd ON u.id = upd.user_id
+    WHERE u.id = ?
+'''
+
+PAIR_PROFILES_SQL = f'''
+    SELECT {PROFILE_COLUMNS}
+    FROM users u
+    LEFT JOIN user_profiles_detailed upd ON u.id = upd.user_id
+    WHERE u.id IN (?, ?)
+'''
+
+CANDIDATES_SQL = f'''
+    SELECT {PROFILE_COLUMNS}
+    FROM users u
+    LEFT JOIN user_profiles_detailed upd ON u.id = upd.user_id
+    WHERE u.id != ? AND u.status = 'validated'
+    ORDER BY u.id
+    LIMIT ?
+'''
+
+
+@functools.lru_cache(maxsize=None)
+def _candidates_by_type_sql(type_count: int) -> str:
+    """Requête de candidats filtrée sur `type_count` types d'utilisateur (une chaîne par arité)"""
+    placeholders = ",".join("?" * type_count)
+    return f'''
+    SELECT {PROFILE_COLUMNS}
+    FROM users u
+    LEFT JOIN user_profiles_detailed upd ON u.id = upd.user_id
+    WHERE u.id != ? AND u.status = 'validated'
+    AND u.user_type IN ({placeholders})
+    ORDER BY u.id
+    LIMIT ?
+'''
+
+
+@functools.lru_cache(maxsize=None)
+def _cf_affected_users_sql(user_count: int) -> str:
+    """Utilisateurs ayant parmi leurs pairs l'un des `user_count` auteurs d'interactions"""
+    placeholders = ",".join("?" * user_count)
+    return f'''
+    SELECT DISTINCT ih1.user_id
+    FROM interaction_history ih2
+    JOIN interaction_history ih1 ON ih1.target_user_id = ih2.target_user_id
+    WHERE ih2.user_id IN ({placeholders}) AND ih1.success_indicator >= 1
+'''
+
+
+# Nombre maximal d'utilisateurs gardés dans le cache du filtrage collaboratif
+CF_CACHE_SIZE = 10_000
+
+INSERT_INTERACTION_SQL = '''
+    INSERT INTO interaction_history 
+    (user_id, target_user_id, interaction_type, compatibility_score, success_indicator)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+INSERT_RECOMMENDATION_SQL = '''
+    INSERT INTO ai_recommendations 
+    (user_id, recommendation_type, title, content, confidence_score, action_suggestions, expires_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Tendances simulées basées sur l'actualité maritime (lecture seule)
+MARITIME_TRENDS = (
+    {
+        "topic": "Intelligence Artificielle Portuaire",
+        "strength": 0.85,
+        "sectors": ("digitalization", "port_management"),
+        "description": "Adoption croissante de l'IA pour l'optimisation des opérations portuaires",
+        "growth_rate": "+45%"
+    },
+    {
+        "topic": "Énergies Renouvelables Offshore",
+        "strength": 0.78,
+        "sectors": ("green_energy", "maritime_tech"),
+        "description": "Expansion des projets éoliens offshore et solutions d'hydrogène vert",
+        "growth_rate": "+32%"
+    },
+    {
+        "topic": "Automatisation Terminaux",
+        "strength": 0.72,
+        "sectors": ("port_equipment", "digitalization"),
+        "description": "Investissement massif dans l'automatisation des terminaux à conteneurs",
+        "growth_rate": "+28%"
+    },
+    {
+        "topic": "Durabilité et Décarbonation",
+        "strength": 0.68,
+        "sectors": ("green_energy", "regulations"),
+        "description": "Nouvelles réglementations environnementales et solutions vertes",
+        "growth_rate": "+25%"
+    }
+)
+
+# Vocabulaire de l'analyse de sentiment simulée
+POSITIVE_WORDS = frozenset(("innovation", "leader", "expert", "qualité", "excellence", "performance"))
+NEGATIVE_WORDS = frozenset(("problème", "difficulté", "défi", "limitation"))
+
+
+class KeywordMatcher:
+    """Détection de mots-clés par catégorie en un seul passage d'expression régulière
+
+    Les mots-clés sont compilés en une alternance (les plus longs d'abord) évaluée
+    dans un lookahead, ce qui trouve aussi les occurrences qui se chevauchent. Aucun
+    mot-clé ne doit être préfixe d'un autre: deux mots-clés ne peuvent alors pas
+    commencer à la même position.
+
+    Préfiltre: un mot-clé ne peut apparaître que si tous ses caractères figurent
+    dans le texte; si aucun mot-clé ne passe ce test, le passage regex est évité.
+    """
+
+    def __init__(self, keywords_by_category: Dict[str, List[str]]):
+        self.ordered = tuple(
+            (keyword, category)
+            for category, keywords in keywords_by_category.items()
+            for keyword in keywords
+        )
+        keywords = sorted({keyword for keyword, _ in self.ordered}, key=len, reverse=True)
+        for i, longer in enumerate(keywords):
+            for shorter in keywords[i + 1:]:
+                if longer.startswith(shorter):
+                    raise ValueError(f"Mot-clé préfixe d'un autre: {shorter!r} / {longer!r}")
+        self._pattern = re.compile("(?=(%s))" % "|".join(map(re.escape, keywords)))
+        self._char_sets = tuple({frozenset(keyword) for keyword in keywords})
+
+    def scan(self, text: str) -> Tuple[List[str], List[str]]:
+        """Mots-clés et catégories détectés, dans l'ordre de déclaration"""
+        text_chars = set(text)
+        if not any(chars <= text_chars for chars in self._char_sets):
+            return [], []
+        found = {match.group(1) for match in self._pattern.finditer(text)}
+        if not found:
+            return [], []
+        detected_keywords = []
+        detected_topics = []
+        for keyword, category in self.ordered:
+            if keyword in found:
+                detected_keywords.append(keyword)
+                if category not in detected_topics:
+                    detected_topics.append(category)
+        return detected_keywords, detected_topics
+
+@functools.lru_cache(maxsize=4096)
+def _text_features(matcher: KeywordMatcher, text: str) -> Tuple[Tuple[str, ...], Tuple[str, ...], str]:
+    """Mots-clés, catégories et sentiment d'une description, mémoïsés par texte"""
+    text_lower = text.lower()
+    
+    # Détection de mots-clés maritimes (un seul passage sur le texte)
+    detected_keywords, detected_topics = matcher.scan(text_lower)
+    
+    # Simulation d'analyse de sentiment
+    positive_count = sum(1 for word in POSITIVE_WORDS if word in text_lower)
+    negative_count = sum(1 for word in NEGATIVE_WORDS if word in text_lower)
+    
+    if positive_count > negative_count:
+        sentiment = "positive"
+    elif negative_count > positive_count:
+        sentiment = "negative"
+    else:
+        sentiment = "neutral"
+    
+    return tuple(detected_keywords), tuple(detected_topics), sentiment
+
 # =============================================================================
 # SERVICE IA DE MATCHING
 # =============================================================================
@@ -105,6 +521,12 @@ class AIMatchingService:
     
     def __init__(self, db_path: str = "instance/siports_production.db"):
         self.db_path = db_path
+        self._pool = SQLitePool(db_path)
+        
+        # Cache du filtrage collaboratif: user_id -> {target_user_id: score}
+        self._cf_cache: Dict[int, Dict[int, float]] = {}
+        self._cf_generation = 0
+        self._cf_lock = threading.Lock()
         self.init_ai_tables()
         
         # Base de connaissances maritime pour simulation NLP
@@ -117,6 +539,7 @@ class AIMatchingService:
             "regulations": ["OMI", "SOLAS", "MARPOL", "conformité", "certification", "audit"],
             "logistics": ["supply chain", "transport multimodal", "conteneurs", "fret", "douane"]
         }
+        self._keyword_matcher = KeywordMatcher(self.maritime_keywords)
         
         # Simulation des modèles d'apprentissage
         self.ml_models = {
@@ -128,268 +551,220 @@ class AIMatchingService:
 
     def init_ai_tables(self):
         """Initialisation des tables IA dans la base de données"""
-        conn = sqlite3.connect(self.db_path)
-        
-        # Table des profils détaillés
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS user_profiles_detailed (
-                user_id INTEGER PRIMARY KEY,
-                sectors_activity TEXT,  -- JSON array
-                products_services TEXT,  -- JSON array  
-                participation_objectives TEXT,  -- JSON array
-                interest_themes TEXT,  -- JSON array
-                visit_objectives TEXT,  -- JSON array
-                skills_expertise TEXT,  -- JSON array
-                matching_criteria TEXT,  -- JSON object
-                looking_for TEXT,  -- JSON array
-                budget_range TEXT,
-                company_size TEXT,
-                geographic_location TEXT,  -- JSON array
-                meeting_availability TEXT,
-                languages TEXT,  -- JSON array
-                certifications TEXT,  -- JSON array
-                preferences TEXT,  -- JSON object
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Table historique des interactions (pour apprentissage)
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS interaction_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                target_user_id INTEGER,
-                interaction_type TEXT,  -- view, message, meeting, connection
-                compatibility_score INTEGER,
-                success_indicator INTEGER,  -- 0=failed, 1=success, 2=ongoing
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Table des recommandations proactives
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS ai_recommendations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                recommendation_type TEXT,
-                title TEXT,
-                content TEXT,
-                confidence_score INTEGER,
-                action_suggestions TEXT,  -- JSON array
-                is_read INTEGER DEFAULT 0,
-                expires_at TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Table des tendances détectées par l'IA
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS ai_trends (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                trend_topic TEXT,
-                trend_strength REAL,
-                affected_sectors TEXT,  -- JSON array
-                description TEXT,
-                detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        with self._pool.connection() as conn:
+            # Table des profils détaillés
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS user_profiles_detailed (
+                    user_id INTEGER PRIMARY KEY,
+                    sectors_activity TEXT,  -- JSON array
+                    products_services TEXT,  -- JSON array  
+                    participation_objectives TEXT,  -- JSON array
+                    interest_themes TEXT,  -- JSON array
+                    visit_objectives TEXT,  -- JSON array
+                    skills_expertise TEXT,  -- JSON array
+                    matching_criteria TEXT,  -- JSON object
+                    looking_for TEXT,  -- JSON array
+                    budget_range TEXT,
+                    company_size TEXT,
+                    geographic_location TEXT,  -- JSON array
+                    meeting_availability TEXT,
+                    languages TEXT,  -- JSON array
+                    certifications TEXT,  -- JSON array
+                    preferences TEXT,  -- JSON object
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+        
+            # Table historique des interactions (pour apprentissage)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS interaction_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    target_user_id INTEGER,
+                    interaction_type TEXT,  -- view, message, meeting, connection
+                    compatibility_score INTEGER,
+                    success_indicator INTEGER,  -- 0=failed, 1=success, 2=ongoing
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Index du filtrage collaboratif (cibles d'un utilisateur, pairs d'une cible)
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_ih_user_target
+                ON interaction_history(user_id, target_user_id, success_indicator)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_ih_target_user
+                ON interaction_history(target_user_id, user_id)
+            ''')
+        
+            # Table des recommandations proactives
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ai_recommendations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    recommendation_type TEXT,
+                    title TEXT,
+                    content TEXT,
+                    confidence_score INTEGER,
+                    action_suggestions TEXT,  -- JSON array
+                    is_read INTEGER DEFAULT 0,
+                    expires_at TIMESTAMP,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
         
-        conn.commit()
-        conn.close()
+            # Table des tendances détectées par l'IA
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ai_trends (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    trend_topic TEXT,
+                    trend_strength REAL,
+                    affected_sectors TEXT,  -- JSON array
+                    description TEXT,
+                    detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+        
+            conn.commit()
 
     # ========================================================================
     # SIMULATION DES MODÈLES IA
     # ========================================================================
     
-    def _simulate_nlp_analysis(self, text: str) -> Dict:
-        """Simulation de l'analyse NLP des descriptions textuelles"""
+    def _simulate_nlp_analysis(self, text: str, confidence: Optional[float] = None) -> Dict:
+        """Simulation de l'analyse NLP des descriptions textuelles
+
+        `confidence` peut être tirée à l'avance par lot (find_matches); à défaut,
+        elle est tirée ici.
+        """
         if not text:
             return {"keywords": [], "sentiment": "neutral", "topics": []}
             
-        text_lower = text.lower()
-        detected_keywords = []
-        detected_topics = []
-        
-        # Détection de mots-clés maritimes
-        for category, keywords in self.maritime_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    detected_keywords.append(keyword)
-                    if category not in detected_topics:
-                        detected_topics.append(category)
-        
-        # Simulation d'analyse de sentiment
-        positive_words = ["innovation", "leader", "expert", "qualité", "excellence", "performance"]
-        negative_words = ["problème", "difficulté", "défi", "limitation"]
-        
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
-        
-        if positive_count > negative_count:
-            sentiment = "positive"
-        elif negative_count > positive_count:
-            sentiment = "negative"
-        else:
-            sentiment = "neutral"
+        detected_keywords, detected_topics, sentiment = _text_features(self._keyword_matcher, text)
         
         return {
-            "keywords": detected_keywords,
-            "topics": detected_topics,
+            "keywords": list(detected_keywords),
+            "topics": list(detected_topics),
             "sentiment": sentiment,
-            "confidence": random.uniform(0.75, 0.95)
+            "confidence": float(_RNG.uniform(0.75, 0.95)) if confidence is None else confidence
         }
     
     def _simulate_compatibility_model(self, profile1: Dict, profile2: Dict) -> int:
         """Simulation du modèle d'apprentissage supervisé pour la compatibilité"""
-        score = 0
-        max_score = 100
-        
-        # Facteur 1: Secteurs d'activité complémentaires (25 points)
-        sectors1 = json.loads(profile1.get('sectors_activity', '[]')) if profile1.get('sectors_activity') else []
-        sectors2 = json.loads(profile2.get('sectors_activity', '[]')) if profile2.get('sectors_activity') else []
-        
-        if sectors1 and sectors2:
-            common_sectors = set(sectors1) & set(sectors2)
-            score += min(25, len(common_sectors) * 8)
-        
-        # Facteur 2: Objectifs complémentaires (20 points)
-        obj1 = json.loads(profile1.get('participation_objectives', '[]')) if profile1.get('participation_objectives') else []
-        looking1 = json.loads(profile1.get('looking_for', '[]')) if profile1.get('looking_for') else []
-        obj2 = json.loads(profile2.get('participation_objectives', '[]')) if profile2.get('participation_objectives') else []
-        
-        # Vérifier si les objectifs de l'un correspondent aux offres de l'autre
+        return int(self._score_candidates(_profile_view(profile1), [_profile_view(profile2)])[0])
+    
+    def _score_candidates(self, profile: Dict, candidates: List[Dict], min_score: int = 0) -> np.ndarray:
+        """Scores de compatibilité d'une vue de profil contre un pool de vues candidates.
+        
+        Les candidats dont le score maximal atteignable reste sous ``min_score``
+        ne passent pas par les comparaisons textuelles (score partiel renvoyé)."""
+        index = ProfileIndex(candidates)
+        count = len(candidates)
+        
+        # Facteurs 1, 3 et 4: recouvrements ensemblistes, calculés sur tout le pool
+        sectors = index.overlap('sectors', profile['sectors'])
+        themes = index.overlap('themes', profile['themes'])
+        geo = index.overlap('geo', profile['geo'])
+        
+        # Facteur 6: disponibilité de meeting
+        availability = profile['availability']
+        cand_availability = [c['availability'] for c in candidates]
+        immediate = np.fromiter(("immédiat" in a for a in cand_availability), dtype=bool, count=count)
+        available = np.fromiter((bool(a) for a in cand_availability), dtype=bool, count=count)
+        availability_points = np.where(
+            immediate | ("immédiat" in availability), 10,
+            np.where(available & bool(availability), 5, 0)
+        )
+        
+        # Facteur 5: taille d'entreprise, par code de catégories
+        size_codes = np.fromiter((_size_code(c['size']) for c in candidates), dtype=np.intp, count=count)
+        size_points = _SIZE_POINTS[_size_code(profile['size']), size_codes]
+        
+        # Élagage: le facteur 2 rapporte au plus 20 points
+        complementarity = np.zeros(count, dtype=np.int32)
+        partial = _aggregate_scores(sectors, complementarity, themes, geo, size_points, availability_points)
+        viable = np.flatnonzero(partial + 20 >= min_score)
+        
+        # Facteur 2: comparaisons textuelles, évaluées par paire
+        for idx in viable:
+            complementarity[idx] = self._complementarity(profile['objective_words'], candidates[idx]['products_lower'])
+        
+        return _aggregate_scores(sectors, complementarity, themes, geo, size_points, availability_points)
+    
+    def _complementarity(self, objective_words: Tuple[Tuple[str, ...], ...], services_lower: Tuple[str, ...]) -> int:
+        """Nombre de couples (objectif, offre) où un mot de l'objectif apparaît dans l'offre"""
         complementarity = 0
-        for objective in obj1:
-            for service in json.loads(profile2.get('products_services', '[]')) if profile2.get('products_services') else []:
-                if any(word in service.lower() for word in objective.lower().split()):
+        for words in objective_words:
+            for service_lower in services_lower:
+                if any(word in service_lower for word in words):
                     complementarity += 1
-        
-        score += min(20, complementarity * 4)
-        
-        # Facteur 3: Thématiques d'intérêt communes (20 points)
-        themes1 = json.loads(profile1.get('interest_themes', '[]')) if profile1.get('interest_themes') else []
-        themes2 = json.loads(profile2.get('interest_themes', '[]')) if profile2.get('interest_themes') else []
-        
-        if themes1 and themes2:
-            common_themes = set(themes1) & set(themes2)
-            score += min(20, len(common_themes) * 5)
-        
-        # Facteur 4: Proximité géographique (15 points)
-        geo1 = json.loads(profile1.get('geographic_location', '[]')) if profile1.get('geographic_location') else []
-        geo2 = json.loads(profile2.get('geographic_location', '[]')) if profile2.get('geographic_location') else []
-        
-        if geo1 and geo2:
-            geo_match = set(geo1) & set(geo2)
-            if geo_match:
-                score += 15
-            elif any(g1 in geo2 or g2 in geo1 for g1 in geo1 for g2 in geo2):
-                score += 8
-        
-        # Facteur 5: Taille d'entreprise compatible (10 points)
-        size1 = profile1.get('company_size', '')
-        size2 = profile2.get('company_size', '')
-        
-        if size1 and size2:
-            # Logique de compatibilité des tailles d'entreprise
-            size_compatibility = {
-                ("startup", "enterprise"): 8,
-                ("sme", "enterprise"): 10,
-                ("sme", "sme"): 10,
-                ("startup", "startup"): 7
-            }
-            
-            for (s1, s2), points in size_compatibility.items():
-                if (s1 in size1.lower() and s2 in size2.lower()) or (s2 in size1.lower() and s1 in size2.lower()):
-                    score += points
-                    break
-        
-        # Facteur 6: Disponibilité de meeting (10 points)
-        avail1 = profile1.get('meeting_availability', '')
-        avail2 = profile2.get('meeting_availability', '')
-        
-        if "immédiat" in avail1.lower() or "immédiat" in avail2.lower():
-            score += 10
-        elif avail1 and avail2:
-            score += 5
-        
-        return min(max_score, score)
+        return complementarity
     
     def _simulate_collaborative_filtering(self, user_id: int, target_users: List[int]) -> Dict[int, float]:
-        """Simulation du filtrage collaboratif basé sur les comportements"""
-        conn = sqlite3.connect(self.db_path)
-        
-        # Récupérer l'historique d'interactions similaires
-        similar_interactions = conn.execute('''
-            SELECT target_user_id, AVG(compatibility_score), COUNT(*), AVG(success_indicator)
-            FROM interaction_history 
-            WHERE user_id IN (
-                SELECT DISTINCT ih2.user_id FROM interaction_history ih2
-                WHERE ih2.target_user_id IN (
-                    SELECT target_user_id FROM interaction_history 
-                    WHERE user_id = ? AND success_indicator >= 1
+        """Simulation du filtrage collaboratif basé sur les comportements
+
+        Les scores sont mémorisés par utilisateur (`_cf_cache`); seules les cibles
+        absentes du cache sont calculées en SQL. Un feedback n'invalide que les
+        utilisateurs dont l'ensemble de pairs ou les interactions agrégées changent.
+        """
+        if not target_users:
+            return {}
+        
+        with self._cf_lock:
+            generation = self._cf_generation
+            known = self._cf_cache.get(user_id, {})
+            scores = {target_id: known[target_id] for target_id in target_users if target_id in known}
+        
+        missing = [target_id for target_id in dict.fromkeys(target_users) if target_id not in scores]
+        if missing:
+            computed = self._compute_collaborative_scores(user_id, missing)
+            scores.update(computed)
+            with self._cf_lock:
+                # Pas de mise en cache si un feedback est arrivé pendant le calcul
+                if self._cf_generation == generation:
+                    if user_id not in self._cf_cache and len(self._cf_cache) >= CF_CACHE_SIZE:
+                        self._cf_cache.pop(next(iter(self._cf_cache)))
+                    self._cf_cache.setdefault(user_id, {}).update(computed)
+        
+        return {target_id: scores[target_id] for target_id in target_users}
+    
+    def _compute_collaborative_scores(self, user_id: int, target_users: List[int]) -> Dict[int, float]:
+        """Scores collaboratifs calculés en base pour `target_users` (0.5 par défaut)"""
+        with self._pool.connection() as conn:
+            # Récupérer l'historique d'interactions similaires, limité aux cibles demandées
+            placeholders = ",".join("?" * len(target_users))
+            similar_interactions = conn.execute(f'''
+                WITH peers AS (
+                    SELECT DISTINCT ih2.user_id
+                    FROM interaction_history ih1
+                    JOIN interaction_history ih2 ON ih2.target_user_id = ih1.target_user_id
+                    WHERE ih1.user_id = ? AND ih1.success_indicator >= 1 AND ih2.user_id != ?
                 )
-            ) AND user_id != ?
-            GROUP BY target_user_id
-            HAVING COUNT(*) >= 2
-        ''', (user_id, user_id)).fetchall()
-        
-        conn.close()
-        
-        collaborative_scores = {}
-        for target_id in target_users:
-            # Score basé sur les interactions similaires
-            base_score = 0.5
-            for interaction in similar_interactions:
-                if interaction[0] == target_id:
-                    # Weighted score based on past success
-                    avg_compatibility = interaction[1] or 70
-                    interaction_count = interaction[2]
-                    success_rate = interaction[3] or 0.5
-                    
-                    collaborative_score = (avg_compatibility / 100) * (1 + success_rate) * math.log(1 + interaction_count)
-                    base_score = max(base_score, collaborative_score)
-            
-            collaborative_scores[target_id] = base_score
+                SELECT target_user_id, AVG(compatibility_score), COUNT(*), AVG(success_indicator)
+                FROM interaction_history
+                WHERE user_id IN peers AND target_user_id IN ({placeholders})
+                GROUP BY target_user_id
+                HAVING COUNT(*) >= 2
+            ''', (user_id, user_id, *target_users)).fetchall()
+        
+        # Score pondéré par les succès passés, une ligne agrégée par cible
+        if similar_interactions:
+            target_ids = np.fromiter((row[0] for row in similar_interactions), dtype=np.int64)
+            avg_compatibility = np.fromiter((row[1] or 70 for row in similar_interactions), dtype=np.float64)
+            interaction_count = np.fromiter((row[2] for row in similar_interactions), dtype=np.float64)
+            success_rate = np.fromiter((row[3] or 0.5 for row in similar_interactions), dtype=np.float64)
+            weighted = (avg_compatibility / 100) * (1 + success_rate) * np.log1p(interaction_count)
+            scores_by_target = dict(zip(target_ids.tolist(), np.maximum(0.5, weighted).tolist()))
+        else:
+            scores_by_target = {}
         
-        return collaborative_scores
+        return {target_id: scores_by_target.get(target_id, 0.5) for target_id in target_users}
     
-    def _simulate_trend_detection(self) -> List[Dict]:
-        """Simulation de détection de tendances par l'IA"""
-        
-        # Tendances simulées basées sur l'actualité maritime
-        current_trends = [
-            {
-                "topic": "Intelligence Artificielle Portuaire",
-                "strength": 0.85,
-                "sectors": ["digitalization", "port_management"],
-                "description": "Adoption croissante de l'IA pour l'optimisation des opérations portuaires",
-                "growth_rate": "+45%"
-            },
-            {
-                "topic": "Énergies Renouvelables Offshore",
-                "strength": 0.78,
-                "sectors": ["green_energy", "maritime_tech"],
-                "description": "Expansion des projets éoliens offshore et solutions d'hydrogène vert",
-                "growth_rate": "+32%"
-            },
-            {
-                "topic": "Automatisation Terminaux",
-                "strength": 0.72,
-                "sectors": ["port_equipment", "digitalization"],
-                "description": "Investissement massif dans l'automatisation des terminaux à conteneurs",
-                "growth_rate": "+28%"
-            },
-            {
-                "topic": "Durabilité et Décarbonation",
-                "strength": 0.68,
-                "sectors": ["green_energy", "regulations"],
-                "description": "Nouvelles réglementations environnementales et solutions vertes",
-                "growth_rate": "+25%"
-            }
-        ]
-        
-        return current_trends
+    def _simulate_trend_detection(self) -> Tuple[Dict, ...]:
+        """Simulation de détection de tendances par l'IA (tendances constantes, non recalculées)"""
+        return MARITIME_TRENDS
 
     # ========================================================================
     # API PRINCIPALES DE MATCHING
@@ -397,93 +772,90 @@ class AIMatchingService:
     
     def find_matches(self, request: MatchingRequest) -> List[MatchResult]:
         """Recherche de matches avec IA avancée"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        
-        # Récupérer le profil de l'utilisateur demandeur
-        user_profile = conn.execute('''
-            SELECT u.*, upd.*
-            FROM users u
-            LEFT JOIN user_profiles_detailed upd ON u.id = upd.user_id
-            WHERE u.id = ?
-        ''', (request.user_id,)).fetchone()
-        
-        if not user_profile:
-            return []
-        
-        # Construire la requête de candidats
-        type_filter = ""
-        if "all" not in request.match_types:
-            placeholders = ",".join(["?" for _ in request.match_types])
-            type_filter = f"AND u.user_type IN ({placeholders})"
-        
-        query = f'''
-            SELECT u.*, upd.*
-            FROM users u
-            LEFT JOIN user_profiles_detailed upd ON u.id = upd.user_id
-            WHERE u.id != ? AND u.status = 'validated'
-            {type_filter}
-            ORDER BY u.id
-            LIMIT ?
-        '''
-        
-        params = [request.user_id] + (request.match_types if "all" not in request.match_types else []) + [request.limit * 2]
-        candidates = conn.execute(query, params).fetchall()
-        
-        conn.close()
-        
-        # Calcul des scores de compatibilité avec IA
+        with self._pool.connection() as conn:
+            # Récupérer le profil de l'utilisateur demandeur
+            user_profile = conn.execute(PROFILE_SQL, (request.user_id,)).fetchone()
+        
+            if not user_profile:
+                return []
+        
+            # Requête de candidats: instruction constante par nombre de types filtrés
+            if "all" in request.match_types:
+                query = CANDIDATES_SQL
+                params = (request.user_id, request.limit * 2)
+            else:
+                query = _candidates_by_type_sql(len(request.match_types))
+                params = (request.user_id, *request.match_types, request.limit * 2)
+            candidates = [_profile_view(row) for row in conn.execute(query, params).fetchall()]
+            user_data = _profile_view(user_profile)
+        
+        # Score du modèle de compatibilité, calculé pour tout le pool en une passe
+        scores = self._score_candidates(user_data, candidates, request.min_compatibility)
+        
+        # Seuls les candidats au-dessus du seuil sont détaillés
+        selected = np.flatnonzero(scores >= request.min_compatibility)
+        
+        # Filtrage collaboratif: ajustement des scores avant sélection
+        final_scores = scores[selected]
+        if len(selected):
+            target_ids = [candidates[idx]['id'] for idx in selected]
+            collaborative_scores = self._simulate_collaborative_filtering(request.user_id, target_ids)
+            collab_boost = np.fromiter(
+                (collaborative_scores.get(target_id, 0.5) for target_id in target_ids),
+                dtype=np.float64, count=len(target_ids)
+            )
+            final_scores = np.minimum(100, (final_scores * (1 + collab_boost * 0.1)).astype(np.int64))
+        
+        # Sélection des meilleurs scores: seuls ces matches sont détaillés
+        top = _top_k(final_scores, request.limit)
+        
+        # Ordre des sujets génériques: une permutation par match, tirées en un seul appel
+        generic_orders = _RNG.permuted(
+            np.tile(np.arange(len(GENERIC_CONVERSATION_TOPICS)), (len(top), 1)), axis=1
+        )
+        
+        # Confiances simulées des analyses NLP, tirées en un seul appel
+        confidences = _RNG.uniform(0.75, 0.95, size=len(top)).tolist()
+        
+        # Analyse NLP du demandeur, commune à tous ses matches
+        user_analysis = self._simulate_nlp_analysis(user_data['description'])
+        
         matches = []
-        for candidate in candidates:
-            # Score du modèle de compatibilité
-            compatibility_score = self._simulate_compatibility_model(
-                dict(user_profile), dict(candidate)
+        for rank, generic_order, confidence in zip(top, generic_orders, confidences):
+            idx = selected[rank]
+            candidate = candidates[idx]
+            compatibility_score = int(scores[idx])
+            
+            # Analyse NLP de la description du candidat
+            candidate_analysis = self._simulate_nlp_analysis(candidate['description'], confidence)
+            
+            # Facteurs de matching détaillés
+            matching_factors = self._analyze_matching_factors(
+                user_data, candidate, user_analysis, candidate_analysis
             )
             
-            if compatibility_score >= request.min_compatibility:
-                # Analyse NLP des descriptions
-                user_analysis = self._simulate_nlp_analysis(user_profile.get('description', ''))
-                candidate_analysis = self._simulate_nlp_analysis(candidate.get('description', ''))
-                
-                # Facteurs de matching détaillés
-                matching_factors = self._analyze_matching_factors(
-                    dict(user_profile), dict(candidate), user_analysis, candidate_analysis
-                )
-                
-                # Génération de l'explication IA
-                explanation = self._generate_ai_explanation(matching_factors, compatibility_score)
-                
-                # Suggestions de sujets de conversation
-                conversation_topics = self._suggest_conversation_topics(
-                    user_analysis, candidate_analysis, matching_factors
-                )
-                
-                match_result = MatchResult(
-                    matched_user_id=candidate['id'],
-                    compatibility_score=compatibility_score,
-                    explanation=explanation,
-                    mutual_interests=matching_factors.get('common_interests', []),
-                    business_potential=self._assess_business_potential(compatibility_score, matching_factors),
-                    matching_factors=matching_factors,
-                    ai_recommendation=self._generate_ai_recommendation(compatibility_score, matching_factors),
-                    suggested_conversation_topics=conversation_topics
-                )
-                
-                matches.append(match_result)
-        
-        # Tri par score de compatibilité et filtrage collaboratif
-        if matches:
-            target_ids = [m.matched_user_id for m in matches]
-            collaborative_scores = self._simulate_collaborative_filtering(request.user_id, target_ids)
+            # Explication, potentiel business et recommandation IA
+            summary = self._summarize_match(compatibility_score, matching_factors)
+            
+            # Suggestions de sujets de conversation
+            conversation_topics = self._suggest_conversation_topics(
+                user_analysis, candidate_analysis, matching_factors, generic_order
+            )
+            
+            match_result = MatchResult(
+                matched_user_id=candidate['id'],
+                compatibility_score=int(final_scores[rank]),
+                explanation=summary.explanation,
+                mutual_interests=matching_factors.get('common_interests', []),
+                business_potential=summary.business_potential,
+                matching_factors=matching_factors,
+                ai_recommendation=summary.ai_recommendation,
+                suggested_conversation_topics=conversation_topics
+            )
             
-            # Ajustement des scores avec filtrage collaboratif
-            for match in matches:
-                collab_boost = collaborative_scores.get(match.matched_user_id, 0.5)
-                match.compatibility_score = min(100, int(match.compatibility_score * (1 + collab_boost * 0.1)))
-        
-        # Tri final et limitation
-        matches.sort(key=lambda x: x.compatibility_score, reverse=True)
-        return matches[:request.limit]
+            matches.append(match_result)
+        
+        return matches
     
     def _analyze_matching_factors(self, profile1: Dict, profile2: Dict, 
                                 analysis1: Dict, analysis2: Dict) -> Dict:
@@ -502,84 +874,78 @@ class AIMatchingService:
         factors['common_interests'] = list(common_topics)
         
         # Alignement sectoriel
-        sectors1 = json.loads(profile1.get('sectors_activity', '[]')) if profile1.get('sectors_activity') else []
-        sectors2 = json.loads(profile2.get('sectors_activity', '[]')) if profile2.get('sectors_activity') else []
+        sectors1 = profile1['sectors']
+        sectors2 = profile2['sectors']
         if sectors1 and sectors2:
             overlap = len(set(sectors1) & set(sectors2))
             factors['sector_alignment'] = min(1.0, overlap / max(len(sectors1), len(sectors2)))
         
         # Besoins complémentaires
-        looking_for1 = json.loads(profile1.get('looking_for', '[]')) if profile1.get('looking_for') else []
-        products2 = json.loads(profile2.get('products_services', '[]')) if profile2.get('products_services') else []
+        looking_for1 = profile1['looking_for']
+        products2 = profile2['products']
         
         complementary = []
         for need in looking_for1:
+            words = _words(need)
             for product in products2:
-                if any(word in product.lower() for word in need.lower().split()):
+                product_lower = _lower(product)
+                if any(word in product_lower for word in words):
                     complementary.append(f"{need} ← {product}")
         
         factors['complementary_needs'] = complementary
         
         return factors
     
-    def _generate_ai_explanation(self, factors: Dict, score: int) -> str:
-        """Génération d'explication IA du matching"""
-        explanations = []
-        
-        if factors['common_interests']:
-            explanations.append(f"Intérêts communs en {', '.join(factors['common_interests'][:2])}")
-        
-        if factors['complementary_needs']:
-            explanations.append(f"Besoins complémentaires identifiés ({len(factors['complementary_needs'])} correspondances)")
+    def _summarize_match(self, score: int, factors: Dict) -> MatchSummary:
+        """Explication IA, potentiel business et recommandation d'action d'un match
+
+        Une seule recherche de tranche de score (`bisect`) sert au ton de
+        l'explication et à la table du potentiel business.
+        """
+        band = bisect.bisect_right(SCORE_BANDS, score)
+        common_interests = factors.get('common_interests', [])
+        complementary_needs = factors.get('complementary_needs', [])
+        sector_alignment = factors.get('sector_alignment', 0)
         
-        if factors['sector_alignment'] > 0.5:
+        # Explication
+        explanations = []
+        if common_interests:
+            explanations.append(f"Intérêts communs en {', '.join(common_interests[:2])}")
+        if complementary_needs:
+            explanations.append(f"Besoins complémentaires identifiés ({len(complementary_needs)} correspondances)")
+        if sector_alignment > 0.5:
             explanations.append("Fort alignement sectoriel")
         
-        if score >= 90:
-            tone = "Correspondance exceptionnelle"
-        elif score >= 80:
-            tone = "Très bonne compatibilité"
-        elif score >= 70:
-            tone = "Bonne compatibilité"
-        else:
-            tone = "Compatibilité modérée"
-        
+        tone = MATCH_TONES[band]
         if explanations:
-            return f"{tone}: {', '.join(explanations)}"
-        else:
-            return f"{tone} basée sur l'analyse comportementale"
-    
-    def _assess_business_potential(self, score: int, factors: Dict) -> str:
-        """Évaluation du potentiel business"""
-        if score >= 90 and len(factors.get('complementary_needs', [])) >= 2:
-            return "Très élevé"
-        elif score >= 80 and (factors.get('sector_alignment', 0) > 0.7 or len(factors.get('common_interests', [])) >= 2):
-            return "Élevé"
-        elif score >= 70:
-            return "Moyen"
+            explanation = f"{tone}: {', '.join(explanations)}"
         else:
-            return "Faible"
-    
-    def _generate_ai_recommendation(self, score: int, factors: Dict) -> str:
-        """Génération de recommandation d'action IA"""
-        recommendations = []
+            explanation = f"{tone} basée sur l'analyse comportementale"
+        
+        # Potentiel business
+        aligned = sector_alignment > 0.7 or len(common_interests) >= 2
+        business_potential = _BUSINESS_POTENTIAL[band][len(complementary_needs) >= 2][aligned]
         
+        # Recommandation d'action
+        recommendations = []
         if score >= 85:
             recommendations.append("🎯 Contact prioritaire recommandé")
-        
-        if factors.get('complementary_needs'):
+        if complementary_needs:
             recommendations.append("💼 Proposez une collaboration directe")
-        
-        if len(factors.get('common_interests', [])) >= 2:
+        if len(common_interests) >= 2:
             recommendations.append("🤝 Excellent potentiel de partenariat")
-        
         if not recommendations:
             recommendations.append("📈 Explorez les opportunités de collaboration")
         
-        return " • ".join(recommendations)
+        return MatchSummary(explanation, business_potential, " • ".join(recommendations))
     
-    def _suggest_conversation_topics(self, analysis1: Dict, analysis2: Dict, factors: Dict) -> List[str]:
-        """Suggestions de sujets de conversation par l'IA"""
+    def _suggest_conversation_topics(self, analysis1: Dict, analysis2: Dict, factors: Dict,
+                                     generic_order: Optional[np.ndarray] = None) -> List[str]:
+        """Suggestions de sujets de conversation par l'IA
+
+        `generic_order` est une permutation des sujets génériques tirée à l'avance
+        (une ligne par match dans find_matches); à défaut, elle est tirée ici.
+        """
         topics = []
         
         # Basé sur les intérêts communs
@@ -595,19 +961,14 @@ class AIMatchingService:
         if factors.get('complementary_needs'):
             topics.append("Opportunités de collaboration business")
         
-        # Sujets génériques maritimes
-        generic_topics = [
-            "Innovations technologiques maritimes",
-            "Réglementations internationales récentes",
-            "Tendances du marché portuaire",
-            "Projets de développement durable"
-        ]
+        if generic_order is None:
+            generic_order = _RNG.permutation(len(GENERIC_CONVERSATION_TOPICS))
         
         # Ajout de sujets génériques si pas assez spécifiques
-        while len(topics) < 3:
-            topic = random.choice(generic_topics)
-            if topic not in topics:
-                topics.append(topic)
+        for i in generic_order:
+            if len(topics) >= 3:
+                break
+            topics.append(GENERIC_CONVERSATION_TOPICS[i])
         
         return topics[:4]
     
@@ -615,122 +976,124 @@ class AIMatchingService:
         """Génération de recommandations proactives par l'IA"""
         recommendations = []
         
+        # Échéances calculées une seule fois pour tout le lot
+        now = datetime.now()
+        expiries = {rec_type: now + ttl for rec_type, ttl in RECOMMENDATION_TTL.items()}
+        # Forme stockée (celle de l'adaptateur datetime de sqlite3), formatée une fois par type
+        expiry_texts = {rec_type: expiry.isoformat(" ") for rec_type, expiry in expiries.items()}
+        
         # Détection des tendances actuelles
         trends = self._simulate_trend_detection()
         
         # Récupération du profil utilisateur
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        
-        user_profile = conn.execute('''
-            SELECT u.*, upd.*
-            FROM users u
-            LEFT JOIN user_profiles_detailed upd ON u.id = upd.user_id
-            WHERE u.id = ?
-        ''', (user_id,)).fetchone()
-        
-        if not user_profile:
-            conn.close()
-            return recommendations
-        
-        user_interests = json.loads(user_profile['interest_themes']) if user_profile['interest_themes'] else []
-        
-        # Recommandations basées sur les tendances
-        for trend in trends:
-            if any(interest in trend['sectors'] for interest in user_interests):
-                recommendation = ProactiveRecommendation(
+        with self._pool.connection() as conn:
+            user_profile = conn.execute(PROFILE_SQL, (user_id,)).fetchone()
+        
+            if not user_profile:
+                return recommendations
+        
+            user_interests = frozenset(_json_list(user_profile['interest_themes']))
+        
+            # Recommandations basées sur les tendances
+            for trend in trends:
+                if not user_interests.isdisjoint(trend['sectors']):
+                    recommendation = ProactiveRecommendation.model_construct(
+                        user_id=user_id,
+                        recommendation_type="trending_topic",
+                        title=f"🔥 Tendance détectée: {trend['topic']}",
+                        content=f"{trend['description']} (Croissance: {trend.get('growth_rate', 'N/A')})",
+                        confidence_score=int(trend['strength'] * 100),
+                        action_suggestions=[
+                            "Rechercher des partenaires dans cette thématique",
+                            "Actualiser votre profil avec ces mots-clés",
+                            "Participer aux discussions sur ce sujet"
+                        ],
+                        expires_at=expiries["trending_topic"]
+                    )
+                    recommendations.append(recommendation)
+        
+            # Nouveaux matches potentiels
+            recent_matches = conn.execute('''
+                SELECT COUNT(*) FROM users u
+                LEFT JOIN user_profiles_detailed upd ON u.id = upd.user_id
+                WHERE u.id != ? AND u.status = 'validated'
+                AND u.created_at > datetime('now', '-7 days')
+            ''', (user_id,)).fetchone()[0]
+        
+            if recent_matches > 0:
+                recommendation = ProactiveRecommendation.model_construct(
                     user_id=user_id,
-                    recommendation_type="trending_topic",
-                    title=f"🔥 Tendance détectée: {trend['topic']}",
-                    content=f"{trend['description']} (Croissance: {trend.get('growth_rate', 'N/A')})",
-                    confidence_score=int(trend['strength'] * 100),
+                    recommendation_type="new_match",
+                    title=f"✨ {recent_matches} nouveaux profils compatibles détectés",
+                    content="De nouveaux participants ont rejoint la plateforme avec des profils correspondant à vos intérêts.",
+                    confidence_score=85,
                     action_suggestions=[
-                        "Rechercher des partenaires dans cette thématique",
-                        "Actualiser votre profil avec ces mots-clés",
-                        "Participer aux discussions sur ce sujet"
+                        "Lancer une nouvelle recherche de matching",
+                        "Examiner les nouveaux profils",
+                        "Envoyer des demandes de connexion"
                     ],
-                    expires_at=datetime.now() + timedelta(days=7)
+                    expires_at=expiries["new_match"]
                 )
                 recommendations.append(recommendation)
         
-        # Nouveaux matches potentiels
-        recent_matches = conn.execute('''
-            SELECT COUNT(*) FROM users u
-            LEFT JOIN user_profiles_detailed upd ON u.id = upd.user_id
-            WHERE u.id != ? AND u.status = 'validated'
-            AND u.created_at > datetime('now', '-7 days')
-        ''', (user_id,)).fetchone()[0]
-        
-        if recent_matches > 0:
-            recommendation = ProactiveRecommendation(
-                user_id=user_id,
-                recommendation_type="new_match",
-                title=f"✨ {recent_matches} nouveaux profils compatibles détectés",
-                content="De nouveaux participants ont rejoint la plateforme avec des profils correspondant à vos intérêts.",
-                confidence_score=85,
-                action_suggestions=[
-                    "Lancer une nouvelle recherche de matching",
-                    "Examiner les nouveaux profils",
-                    "Envoyer des demandes de connexion"
-                ],
-                expires_at=datetime.now() + timedelta(days=3)
-            )
-            recommendations.append(recommendation)
-        
-        # Sauvegarde des recommandations
-        for rec in recommendations:
-            conn.execute('''
-                INSERT INTO ai_recommendations 
-                (user_id, recommendation_type, title, content, confidence_score, action_suggestions, expires_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                rec.user_id, rec.recommendation_type, rec.title, rec.content,
-                rec.confidence_score, json.dumps(rec.action_suggestions), rec.expires_at
-            ))
+            # Sauvegarde des recommandations en une seule instruction préparée
+            conn.executemany(INSERT_RECOMMENDATION_SQL, [
+                (rec.user_id, rec.recommendation_type, rec.title, rec.content,
+                 rec.confidence_score, _json_dumps(rec.action_suggestions),
+                 expiry_texts[rec.recommendation_type])
+                for rec in recommendations
+            ])
         
-        conn.commit()
-        conn.close()
+            conn.commit()
         
         return recommendations
     
     def update_interaction_feedback(self, user_id: int, target_user_id: int, 
                                   interaction_type: str, success_indicator: int):
         """Mise à jour du feedback d'interaction pour l'apprentissage par renforcement"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        
-        # Récalcul du score de compatibilité pour ce feedback
-        user_profile = conn.execute('''
-            SELECT u.*, upd.*
-            FROM users u
-            LEFT JOIN user_profiles_detailed upd ON u.id = upd.user_id
-            WHERE u.id = ?
-        ''', (user_id,)).fetchone()
-        
-        target_profile = conn.execute('''
-            SELECT u.*, upd.*
-            FROM users u
-            LEFT JOIN user_profiles_detailed upd ON u.id = upd.user_id
-            WHERE u.id = ?
-        ''', (target_user_id,)).fetchone()
-        
-        if user_profile and target_profile:
-            # Convert Row objects to dictionaries
-            user_dict = {key: user_profile[key] for key in user_profile.keys()}
-            target_dict = {key: target_profile[key] for key in target_profile.keys()}
+        self.update_interaction_feedback_batch(
+            [(user_id, target_user_id, interaction_type, success_indicator)]
+        )
+    
+    def update_interaction_feedback_batch(self, feedbacks: List[Tuple[int, int, str, int]]):
+        """Enregistre un lot de feedbacks (user_id, target_user_id, type, succès) en une transaction"""
+        if not feedbacks:
+            return
+        
+        with self._pool.connection() as conn:
+            interactions = []
+            for user_id, target_user_id, interaction_type, success_indicator in feedbacks:
+                # Récalcul du score de compatibilité pour ce feedback (les deux profils en une requête)
+                rows = conn.execute(PAIR_PROFILES_SQL, (user_id, target_user_id)).fetchall()
+                profiles_by_id = {row['id']: row for row in rows}
+                user_profile = profiles_by_id.get(user_id)
+                target_profile = profiles_by_id.get(target_user_id)
+                
+                if user_profile and target_profile:
+                    compatibility_score = self._simulate_compatibility_model(
+                        user_profile, target_profile
+                    )
+                    interactions.append((
+                        user_id, target_user_id, interaction_type, compatibility_score, success_indicator
+                    ))
             
-            compatibility_score = self._simulate_compatibility_model(
-                user_dict, target_dict
-            )
+            if not interactions:
+                return
             
-            conn.execute('''
-                INSERT INTO interaction_history 
-                (user_id, target_user_id, interaction_type, compatibility_score, success_indicator)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, target_user_id, interaction_type, compatibility_score, success_indicator))
-        
-        conn.commit()
-        conn.close()
+            conn.executemany(INSERT_INTERACTION_SQL, interactions)
+            
+            # Scores touchés : les auteurs et cibles, plus tout utilisateur ayant réussi une
+            # interaction avec une cible d'un auteur (l'auteur est, ou devient, l'un de ses pairs)
+            authors = list({interaction[0] for interaction in interactions})
+            affected = {row[0] for row in conn.execute(_cf_affected_users_sql(len(authors)), authors)}
+            affected.update(authors)
+            affected.update(interaction[1] for interaction in interactions)
+            conn.commit()
+        
+        with self._cf_lock:
+            for user_id in affected:
+                self._cf_cache.pop(user_id, None)
+            self._cf_generation += 1
 
 # =============================================================================
 # INSTANCE GLOBALE
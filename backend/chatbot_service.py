@@ -5,13 +5,18 @@ Service pour chatbot IA gratuit avec support Ollama et simulation pour développ
 
 import time
 import random
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from pydantic import BaseModel, Field
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Réponses générées récentes : (mode, contexte, message) -> (échéance monotonic, texte)
+RESPONSE_CACHE_TTL = 600.0
+RESPONSE_CACHE_SIZE = 2000
+
 class ContextType(str, Enum):
     GENERAL = "general"
     EXHIBITOR = "exhibitor" 
@@ -40,6 +45,10 @@ class SiportsAIService:
         self.model_name = model_name
         self.conversation_history: Dict[str, List[Dict[str, str]]] = {}
         
+        # Textes générés récemment et générations en cours, partagés entre sessions
+        self.response_cache: Dict[tuple, tuple] = {}
+        self.inflight: Dict[tuple, asyncio.Future] = {}
+        
         # Templates de contexte pour réponses spécialisées
         self.context_templates = {
             ContextType.GENERAL: """Tu es un assistant expert pour SIPORTS v2.0, spécialisé dans les événements maritimes. 
@@ -168,6 +177,56 @@ class SiportsAIService:
         }
         return actions_map.get(context_type, [])
 
+    async def _generate_uncached(self, request: ChatRequest, session_id: str) -> Tuple[str, bool]:
+        """Génère le texte de réponse selon le mode ; le booléen indique s'il peut être mis en cache"""
+        if self.mock_mode:
+            return await self.generate_response_mock(request.message, request.context_type, session_id), True
+        return await self._generate_ollama(request, session_id)
+
+    async def generate_text(self, request: ChatRequest, session_id: str) -> str:
+        """Texte de réponse mis en cache, une seule génération en cours par (contexte, message)"""
+        # Avec Ollama la réponse dépend de l'historique : seul le premier message d'une session est partagé
+        if not self.mock_mode and len(self.conversation_history[session_id]) > 1:
+            text, _ = await self._generate_uncached(request, session_id)
+            return text
+        
+        key = (self.mock_mode, request.context_type, request.message)
+        cached = self.response_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        # Requête identique déjà en cours : attendre son résultat plutôt que régénérer
+        pending = self.inflight.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Annulation de cette requête : propagée ; annulation de la génération partagée
+                # (client déconnecté) : la requête relance la génération elle-même
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                return await self.generate_text(request, session_id)
+        
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            text, cacheable = await self._generate_uncached(request, session_id)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # marquée comme lue si aucune requête n'attendait
+            raise
+        else:
+            future.set_result(text)
+            if cacheable:
+                if len(self.response_cache) >= RESPONSE_CACHE_SIZE:
+                    self.response_cache.pop(next(iter(self.response_cache)))
+                self.response_cache[key] = (time.monotonic() + RESPONSE_CACHE_TTL, text)
+            return text
+        finally:
+            self.inflight.pop(key, None)
+            if not future.done():
+                future.cancel()
+
     async def generate_response(self, request: ChatRequest) -> ChatResponse:
         """Point d'entrée principal pour génération de réponse"""
         try:
@@ -188,13 +247,13 @@ class SiportsAIService:
             if len(self.conversation_history[session_id]) > 20:
                 self.conversation_history[session_id] = self.conversation_history[session_id][-20:]
 
+            # Texte partagé entre requêtes identiques (cache + génération unique)
+            ai_response = await self.generate_text(request, session_id)
             if self.mock_mode:
                 # Mode simulation pour développement
-                ai_response = await self.generate_response_mock(request.message, request.context_type, session_id)
                 confidence = round(random.uniform(0.8, 0.95), 2)
             else:
                 # Mode Ollama (à implémenter en production)
-                ai_response = await self.generate_response_ollama(request, session_id)
                 confidence = 0.85
 
             # Ajouter réponse IA à l'historique
@@ -216,7 +275,7 @@ class SiportsAIService:
             )
             
         except Exception as e:
-            logger.error(f"Erreur génération réponse chatbot: {str(e)}")
+            logger.error("Erreur génération réponse chatbot: %s", e)
             return ChatResponse(
                 response="Désolé, je rencontre une difficulté technique. Pouvez-vous reformuler votre question ?",
                 response_type=request.context_type.value if hasattr(request.context_type, 'value') else request.context_type,
@@ -227,40 +286,47 @@ class SiportsAIService:
 
     async def generate_response_ollama(self, request: ChatRequest, session_id: str) -> str:
         """Génération réponse avec Ollama (implémentation future)"""
-        # TODO: Implémenter l'intégration Ollama réelle
+        text, _ = await self._generate_ollama(request, session_id)
+        return text
+
+    async def _generate_ollama(self, request: ChatRequest, session_id: str) -> Tuple[str, bool]:
+        """Réponse Ollama, ou repli simulé (non mis en cache) si Ollama est indisponible"""
         try:
-            import ollama
-            
-            # Préparer le contexte système
-            system_prompt = self.context_templates[request.context_type]
-            
-            # Préparer l'historique pour le contexte
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Ajouter historique récent (5 derniers échanges)
-            recent_history = self.conversation_history[session_id][-10:] if session_id in self.conversation_history else []
-            for msg in recent_history:
-                messages.append({"role": msg["role"], "content": msg["content"]})
-            
-            # Générer réponse avec Ollama
-            response = ollama.chat(
-                model=self.model_name,
-                messages=messages,
-                options={
-                    "temperature": 0.7,
-                    "max_tokens": 500,
-                    "top_p": 0.9
-                }
-            )
-            
-            return response['message']['content']
-            
+            return await self._ollama_chat(request, session_id), True
         except ImportError:
             logger.warning("Ollama non disponible, utilisation du mode mock")
-            return await self.generate_response_mock(request.message, request.context_type, session_id)
         except Exception as e:
-            logger.error(f"Erreur Ollama: {str(e)}")
-            return await self.generate_response_mock(request.message, request.context_type, session_id)
+            logger.error("Erreur Ollama: %s", e)
+        return await self.generate_response_mock(request.message, request.context_type, session_id), False
+
+    async def _ollama_chat(self, request: ChatRequest, session_id: str) -> str:
+        """Appel Ollama, exécuté hors de la boucle d'événements"""
+        import ollama
+        
+        # Préparer le contexte système
+        system_prompt = self.context_templates[request.context_type]
+        
+        # Préparer l'historique pour le contexte
+        messages = [{"role": "system", "content": system_prompt}]
+        
+        # Ajouter historique récent (5 derniers échanges)
+        recent_history = self.conversation_history[session_id][-10:] if session_id in self.conversation_history else []
+        for msg in recent_history:
+            messages.append({"role": msg["role"], "content": msg["content"]})
+        
+        # Générer réponse avec Ollama (appel bloquant déporté dans un thread)
+        response = await asyncio.to_thread(
+            ollama.chat,
+            model=self.model_name,
+            messages=messages,
+            options={
+                "temperature": 0.7,
+                "max_tokens": 500,
+                "top_p": 0.9
+            }
+        )
+        
+        return response['message']['content']
 
     def get_conversation_history(self, session_id: str) -> List[Dict[str, Any]]:
         """Récupère l'historique de conversation pour une session"""
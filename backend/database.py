@@ -37,11 +37,22 @@ if DATABASE_URL.startswith("postgresql://"):
 elif not DATABASE_URL.startswith("postgresql+asyncpg://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql", "postgresql+asyncpg", 1)
 
-# Create async engine
+# Create async engine (un seul moteur par processus, partagé par toutes les sessions)
+# Pool de 20 connexions + 40 en débordement pour les pics de clients concurrents
+# Journalisation SQL uniquement à la demande (SQL_ECHO=1) : hors du chemin critique en production
 engine = create_async_engine(
     DATABASE_URL,
-    echo=True,  # Set to False in production
-    pool_pre_ping=True
+    echo=os.environ.get('SQL_ECHO', '').lower() in ('1', 'true', 'yes'),
+    pool_pre_ping=True,
+    pool_size=20,
+    max_overflow=40,
+    pool_recycle=1800,
+    pool_timeout=30,
+    connect_args={
+        # Réutilisation des requêtes préparées asyncpg entre les requêtes HTTP
+        "statement_cache_size": 1024,
+        "prepared_statement_cache_size": 1024,
+    },
 )
 
 # Create session factory
@@ -58,7 +69,7 @@ async def create_tables():
             await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables created successfully")
     except Exception as e:
-        logger.error(f"Error creating tables: {e}")
+        logger.error("Error creating tables: %s", e)
         raise
 
 async def get_session() -> AsyncSession:
@@ -80,5 +91,5 @@ async def test_connection():
             logger.info("Database connection successful")
             return True
     except Exception as e:
-        logger.error(f"Database connection failed: {e}")
+        logger.error("Database connection failed: %s", e)
         return False
\ No newline at end of file
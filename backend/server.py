@@ -8,23 +8,47 @@ Optimisé pour Railway deployment
 
 import os
 import sys
-from datetime import datetime, timedelta
-from fastapi import FastAPI, HTTPException, Depends, Request
+import time
+import asyncio
+import functools
+from datetime import datetime
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import jwt
 import secrets
+import hashlib
 import json
 import sqlite3
 from werkzeug.security import generate_password_hash, check_password_hash
 import logging
 
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+except ImportError:  # orjson est optionnel: repli sur le module json standard
+    orjson = None
+    from fastapi.responses import JSONResponse as DefaultJSONResponse
+
+if orjson is not None:
+    json_loads = orjson.loads
+    
+    def json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+else:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
 # Import chatbot service
 from chatbot_service import siports_ai_service, ChatRequest, ChatResponse
 
+# Pool de connexions SQLite partagé
+from sqlite_pool import SQLitePool
+
 # Import AI matching service  
 from ai_matching_service import (
     ai_matching_service, MatchingRequest, MatchResult, 
@@ -37,13 +61,55 @@ logger = logging.getLogger(__name__)
 
 # Configuration
 JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', secrets.token_hex(32))
+JWT_ALGORITHM = 'HS256'
+JWT_TOKEN_TTL = 7 * 86400  # secondes
 DATABASE_URL = os.environ.get('DATABASE_URL', 'instance/siports_production.db')
+# scrypt (hashlib/OpenSSL) : les anciens hachages sont migrés à la connexion
+PASSWORD_HASH_METHOD = 'scrypt'
+# Recherche plein texte des messages (FTS5), activée par init_database si SQLite la supporte
+MESSAGES_FTS_ENABLED = False
+
+# Requêtes SQL (texte constant : réutilisé par le cache de requêtes préparées de sqlite3)
+USER_BY_ID_SQL = '''
+    SELECT id, email, user_type, first_name, last_name, company, phone,
+           visitor_package, partnership_package, status, created_at
+    FROM users WHERE id = ?
+'''
+USER_BY_EMAIL_SQL = '''
+    SELECT id, email, password_hash, status, user_type, first_name, last_name,
+           company, visitor_package, partnership_package
+    FROM users WHERE email = ?
+'''
+USER_EXISTS_SQL = 'SELECT id FROM users WHERE email = ?'
+INSERT_USER_SQL = '''
+    INSERT INTO users (email, password_hash, user_type, first_name, last_name, company, phone)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+UPDATE_VISITOR_PACKAGE_SQL = 'UPDATE users SET visitor_package = ? WHERE id = ?'
+ADMIN_STATS_SQL = '''
+    SELECT COUNT(*) AS total_users,
+           COALESCE(SUM(user_type = 'visitor'), 0) AS visitors,
+           COALESCE(SUM(user_type = 'exhibitor'), 0) AS exhibitors,
+           COALESCE(SUM(user_type = 'partner'), 0) AS partners,
+           COALESCE(SUM(status = 'pending'), 0) AS pending,
+           COALESCE(SUM(status = 'validated'), 0) AS validated,
+           COALESCE(SUM(status = 'rejected'), 0) AS rejected
+    FROM users
+'''
+PENDING_USERS_SQL = '''
+    SELECT id, email, first_name, last_name, company, user_type, created_at
+    FROM users WHERE status = 'pending'
+    ORDER BY created_at DESC
+'''
+UPDATE_PASSWORD_HASH_SQL = 'UPDATE users SET password_hash = ? WHERE id = ?'
+SET_USER_STATUS_SQL = 'UPDATE users SET status = ? WHERE id = ?'
 
 # FastAPI app
 app = FastAPI(
     title="SIPORTS v2.0 API",
     description="API pour événements maritimes avec chatbot IA",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=DefaultJSONResponse
 )
 
 # CORS configuration for production
@@ -58,12 +124,111 @@ app.add_middleware(
 # Security
 security = HTTPBearer()
 
+def hash_password(password: str) -> str:
+    """Hash a password with the configured scheme"""
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+def needs_rehash(password_hash: str) -> bool:
+    """True when a stored hash predates the configured scheme"""
+    return not password_hash.startswith(PASSWORD_HASH_METHOD + ':')
+
+def init_messages_search(conn) -> bool:
+    """Create the FTS5 index on messages.content, kept in sync by triggers"""
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+    ).fetchone():
+        return True
+    
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE messages_fts USING fts5(
+                content, content='messages', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        logger.warning("FTS5 unavailable, message search falls back to LIKE: %s", e)
+        return False
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF content ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+        END
+    ''')
+    
+    # Indexation des messages déjà présents
+    conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+    return True
+
+def init_unread_counters(conn):
+    """Create the per-user unread counters, kept in sync with messages by triggers"""
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_unread'"
+    ).fetchone():
+        return
+    
+    conn.execute('''
+        CREATE TABLE user_unread (
+            user_id INTEGER PRIMARY KEY,
+            unread INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS messages_unread_ai AFTER INSERT ON messages
+        WHEN NOT new.is_read BEGIN
+            INSERT INTO user_unread(user_id, unread) VALUES (new.recipient_id, 1)
+            ON CONFLICT(user_id) DO UPDATE SET unread = unread + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS messages_unread_read AFTER UPDATE OF is_read ON messages
+        WHEN new.is_read AND NOT old.is_read BEGIN
+            UPDATE user_unread SET unread = unread - 1 WHERE user_id = old.recipient_id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS messages_unread_unread AFTER UPDATE OF is_read ON messages
+        WHEN old.is_read AND NOT new.is_read BEGIN
+            INSERT INTO user_unread(user_id, unread) VALUES (new.recipient_id, 1)
+            ON CONFLICT(user_id) DO UPDATE SET unread = unread + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS messages_unread_ad AFTER DELETE ON messages
+        WHEN NOT old.is_read BEGIN
+            UPDATE user_unread SET unread = unread - 1 WHERE user_id = old.recipient_id;
+        END
+    ''')
+    
+    # Compteurs des messages déjà présents
+    conn.execute('''
+        INSERT INTO user_unread(user_id, unread)
+        SELECT recipient_id, COUNT(*) FROM messages WHERE is_read = FALSE GROUP BY recipient_id
+    ''')
+
 # Database initialization
 def init_database():
     """Initialize production database"""
+    global MESSAGES_FTS_ENABLED
     os.makedirs('instance', exist_ok=True)
     conn = sqlite3.connect(DATABASE_URL)
     
+    # WAL (persistant dans le fichier) et pragmas du pool, dès la création du schéma
+    for pragma in SQLitePool.PRAGMAS:
+        conn.execute(pragma)
+    
     # Users table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -82,26 +247,60 @@ def init_database():
         )
     ''')
     
-    # Insert admin user if not exists
-    admin_password = generate_password_hash('admin123')
+    # Index des candidats au matching (status = 'validated', filtre user_type)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_status_type ON users(status, user_type)')
+    # Liste d'attente admin (status = 'pending' ORDER BY created_at DESC) sans tri temporaire
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_status_created ON users(status, created_at DESC)')
+    
+    # Messages table
     conn.execute('''
-        INSERT OR IGNORE INTO users (email, password_hash, user_type, status, first_name, last_name)
-        VALUES (?, ?, 'admin', 'validated', 'Admin', 'SIPORTS')
-    ''', ('admin@siportevent.com', admin_password))
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_id INTEGER NOT NULL,
+            recipient_id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            message_type TEXT DEFAULT 'text',
+            is_read BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sender_id) REFERENCES users(id),
+            FOREIGN KEY (recipient_id) REFERENCES users(id)
+        )
+    ''')
     
-    # Sample data
-    visitor_password = generate_password_hash('visitor123')
-    exhibitor_password = generate_password_hash('exhibitor123')
+    # Messages non lus par destinataire et fil d'une conversation par paire
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_messages_recipient_unread ON messages(recipient_id, is_read)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_messages_pair_time ON messages(sender_id, recipient_id, created_at DESC)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_messages_pair_time_rev ON messages(recipient_id, sender_id, created_at DESC)')
+    MESSAGES_FTS_ENABLED = init_messages_search(conn)
+    init_unread_counters(conn)
     
-    conn.execute('''
-        INSERT OR IGNORE INTO users (email, password_hash, user_type, visitor_package, status, first_name, last_name, company)
-        VALUES (?, ?, 'visitor', 'Premium', 'validated', 'Marie', 'Dupont', 'Port Autonome Marseille')
-    ''', ('visitor@example.com', visitor_password))
+    # Comptes existants : le hachage (scrypt) n'est calculé que pour les comptes manquants
+    existing = {row[0] for row in conn.execute(
+        'SELECT email FROM users WHERE email IN (?, ?, ?)',
+        ('admin@siportevent.com', 'visitor@example.com', 'exposant@example.com')
+    )}
     
-    conn.execute('''
-        INSERT OR IGNORE INTO users (email, password_hash, user_type, partnership_package, status, first_name, last_name, company)
-        VALUES (?, ?, 'exhibitor', 'Gold', 'validated', 'Jean', 'Martin', 'Maritime Solutions Ltd')
-    ''', ('exposant@example.com', exhibitor_password))
+    # Insert admin user if not exists
+    if 'admin@siportevent.com' not in existing:
+        conn.execute('''
+            INSERT OR IGNORE INTO users (email, password_hash, user_type, status, first_name, last_name)
+            VALUES (?, ?, 'admin', 'validated', 'Admin', 'SIPORTS')
+        ''', ('admin@siportevent.com', hash_password('admin123')))
+    
+    # Sample data (désactivable avec SEED_SAMPLE_USERS=0)
+    seed_samples = os.environ.get('SEED_SAMPLE_USERS', '1') == '1'
+    
+    if seed_samples and 'visitor@example.com' not in existing:
+        conn.execute('''
+            INSERT OR IGNORE INTO users (email, password_hash, user_type, visitor_package, status, first_name, last_name, company)
+            VALUES (?, ?, 'visitor', 'Premium', 'validated', 'Marie', 'Dupont', 'Port Autonome Marseille')
+        ''', ('visitor@example.com', hash_password('visitor123')))
+    
+    if seed_samples and 'exposant@example.com' not in existing:
+        conn.execute('''
+            INSERT OR IGNORE INTO users (email, password_hash, user_type, partnership_package, status, first_name, last_name, company)
+            VALUES (?, ?, 'exhibitor', 'Gold', 'validated', 'Jean', 'Martin', 'Maritime Solutions Ltd')
+        ''', ('exposant@example.com', hash_password('exhibitor123')))
     
     # Ensure test accounts are validated (in case they exist but are not validated)
     conn.execute('''
@@ -110,11 +309,20 @@ def init_database():
     ''')
     
     conn.commit()
+    
+    # Statistiques du planificateur : ANALYZE complet la première fois, puis mise à jour incrémentale
+    has_stats = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).fetchone()
+    conn.execute('PRAGMA optimize' if has_stats else 'ANALYZE')
     conn.close()
 
 # Initialize database on startup
 init_database()
 
+# Connexions SQLite réutilisées par les endpoints (ouvertes après création du schéma)
+db_pool = SQLitePool(DATABASE_URL)
+
 # Models
 class UserLogin(BaseModel):
     email: str
@@ -151,45 +359,111 @@ class UserProfileDetailed(BaseModel):
     certifications: Optional[List[str]] = []
 
 # Helper functions
+# Codec JWT et clé encodée une seule fois
+jwt_codec = jwt.PyJWT()
+JWT_KEY = JWT_SECRET_KEY.encode()
+
 def create_jwt_token(user_data: dict) -> str:
     """Create JWT token"""
     payload = {
         'user_id': user_data['id'],
         'email': user_data['email'],
         'user_type': user_data['user_type'],
-        'exp': datetime.utcnow() + timedelta(days=7)
+        'exp': int(time.time()) + JWT_TOKEN_TTL
     }
-    return jwt.encode(payload, JWT_SECRET_KEY, algorithm='HS256')
+    return jwt_codec.encode(payload, JWT_KEY, algorithm=JWT_ALGORITHM)
+
+@functools.lru_cache(maxsize=4096)
+def decode_jwt_token(token: str) -> dict:
+    """Decode and verify a token once; a client's next requests hit the cache"""
+    return jwt_codec.decode(token, JWT_KEY, algorithms=[JWT_ALGORITHM])
 
 def verify_jwt_token(token: str) -> dict:
     """Verify JWT token"""
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
-        return payload
+        payload = decode_jwt_token(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expiré")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Token invalide")
+    
+    # Un token en cache peut avoir expiré depuis sa vérification
+    if payload['exp'] < time.time():
+        raise HTTPException(status_code=401, detail="Token expiré")
+    return payload
+
+def query_db(sql: str, params: tuple = (), one: bool = False, row_factory=None):
+    """Run a read query on a pooled connection (blocking)"""
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        if row_factory is not None:
+            cursor.row_factory = row_factory
+        cursor.execute(sql, params)
+        return cursor.fetchone() if one else cursor.fetchall()
+
+def execute_db(sql: str, params: tuple = ()) -> int:
+    """Run a write statement on a pooled connection and commit (blocking)"""
+    with db_pool.connection() as conn:
+        cursor = conn.execute(sql, params)
+        conn.commit()
+        return cursor.lastrowid
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def encode_static_payload(payload) -> tuple:
+    """Encode a constant payload once, as JSONResponse would, with its ETag"""
+    body = json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+    return body, '"%s"' % hashlib.sha1(body).hexdigest()
+
+def static_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Serve pre-encoded JSON, answering 304 when the client copy is current"""
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers={'ETag': etag})
+    return Response(content=body, media_type='application/json', headers={'ETag': etag})
+
+async def fetch_one(sql: str, params: tuple = ()):
+    """Read a single row without blocking the event loop"""
+    return await run_in_threadpool(query_db, sql, params, True)
+
+async def fetch_all(sql: str, params: tuple = (), row_factory=None):
+    """Read all rows without blocking the event loop"""
+    return await run_in_threadpool(query_db, sql, params, False, row_factory)
+
+async def execute(sql: str, params: tuple = ()) -> int:
+    """Write and commit without blocking the event loop, returns lastrowid"""
+    return await run_in_threadpool(execute_db, sql, params)
+
+# Utilisateurs authentifiés récemment : user_id -> (échéance monotonic, ligne)
+USER_CACHE_TTL = 30.0
+USER_CACHE_SIZE = 10_000
+user_cache = {}
+
+def invalidate_user(user_id: int):
+    """Drop a cached user after any write to its row"""
+    user_cache.pop(user_id, None)
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current user from JWT token"""
     token = credentials.credentials
     payload = verify_jwt_token(token)
+    user_id = payload['user_id']
     
-    conn = sqlite3.connect(DATABASE_URL)
-    conn.row_factory = sqlite3.Row
-    user = conn.execute(
-        'SELECT * FROM users WHERE id = ?',
-        (payload['user_id'],)
-    ).fetchone()
-    conn.close()
+    now = time.monotonic()
+    cached = user_cache.get(user_id)
+    if cached and cached[0] > now:
+        return dict(cached[1])
+    
+    # Décodage JWT sur la boucle, lecture SQLite dans le threadpool
+    user = await fetch_one(USER_BY_ID_SQL, (user_id,))
     
     if not user:
         raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
     
+    user = dict(user)
+    if len(user_cache) >= USER_CACHE_SIZE:
+        user_cache.pop(next(iter(user_cache)))
+    user_cache[user_id] = (now + USER_CACHE_TTL, user)
     return dict(user)
 
-def admin_required(user: dict = Depends(get_current_user)):
+async def admin_required(user: dict = Depends(get_current_user)):
     """Admin authorization required"""
     if user['user_type'] != 'admin':
         raise HTTPException(status_code=403, detail="Accès admin requis")
@@ -203,32 +477,20 @@ def admin_required(user: dict = Depends(get_current_user)):
 async def register(user: UserRegister):
     """User registration"""
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        
         # Check if user exists
-        existing = conn.execute(
-            'SELECT id FROM users WHERE email = ?',
-            (user.email,)
-        ).fetchone()
+        existing = await fetch_one(USER_EXISTS_SQL, (user.email,))
         
         if existing:
             raise HTTPException(status_code=400, detail="Utilisateur existant")
         
-        # Create user
-        password_hash = generate_password_hash(user.password)
-        cursor = conn.execute('''
-            INSERT INTO users (email, password_hash, user_type, first_name, last_name, company, phone)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (user.email, password_hash, user.user_type, user.first_name, user.last_name, user.company, user.phone))
-        
-        user_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        # Create user (hachage coûteux en CPU : hors de la boucle d'événements)
+        password_hash = await run_in_threadpool(hash_password, user.password)
+        user_id = await execute(INSERT_USER_SQL, (user.email, password_hash, user.user_type, user.first_name, user.last_name, user.company, user.phone))
         
         return {"message": "Inscription réussie", "user_id": user_id}
         
     except Exception as e:
-        logger.error(f"Registration error: {str(e)}")
+        logger.error("Registration error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur inscription")
 
 @app.get("/api/auth/verify")
@@ -240,222 +502,230 @@ async def verify_token(user: dict = Depends(get_current_user)):
 async def login(user: UserLogin):
     """User login"""
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        conn.row_factory = sqlite3.Row
+        db_user = await fetch_one(USER_BY_EMAIL_SQL, (user.email,))
+        
+        if not db_user:
+            raise HTTPException(status_code=401, detail="Identifiants invalides")
         
-        db_user = conn.execute(
-            'SELECT * FROM users WHERE email = ?',
-            (user.email,)
-        ).fetchone()
-        conn.close()
+        # Déballage positionnel, dans l'ordre des colonnes de USER_BY_EMAIL_SQL
+        (user_id, email, password_hash, status, user_type, first_name, last_name,
+         company, visitor_package, partnership_package) = db_user
         
-        if not db_user or not check_password_hash(db_user['password_hash'], user.password):
+        if not await run_in_threadpool(check_password_hash, password_hash, user.password):
             raise HTTPException(status_code=401, detail="Identifiants invalides")
         
-        if db_user['status'] != 'validated':
+        if status != 'validated':
             raise HTTPException(status_code=403, detail="Compte en attente de validation")
         
+        # Migration progressive des anciens hachages (pbkdf2) après vérification réussie
+        if needs_rehash(password_hash):
+            new_hash = await run_in_threadpool(hash_password, user.password)
+            await execute(UPDATE_PASSWORD_HASH_SQL, (new_hash, user_id))
+            invalidate_user(user_id)
+        
+        user_data = {
+            "id": user_id,
+            "email": email,
+            "first_name": first_name,
+            "last_name": last_name,
+            "company": company,
+            "user_type": user_type,
+            "visitor_package": visitor_package,
+            "partnership_package": partnership_package
+        }
+        
         # Create JWT token
-        user_data = dict(db_user)
         token = create_jwt_token(user_data)
         
         # Return user data with token
         return {
             "access_token": token,
             "token_type": "bearer",
-            "user": {
-                "id": user_data['id'],
-                "email": user_data['email'],
-                "first_name": user_data['first_name'],
-                "last_name": user_data['last_name'],
-                "company": user_data['company'],
-                "user_type": user_data['user_type'],
-                "visitor_package": user_data['visitor_package'],
-                "partnership_package": user_data['partnership_package']
-            }
+            "user": user_data
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Login error: {str(e)}")
+        logger.error("Login error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur connexion")
 
 # =============================================================================
 # VISITOR PACKAGES ENDPOINTS
 # =============================================================================
 
+# Catalogue constant : encodé une seule fois au chargement du module
+VISITOR_PACKAGES = [
+    {
+        "id": 1,
+        "name": "Free Pass",
+        "price": 0,
+        "currency": "€",
+        "description": "Accès gratuit aux espaces d'exposition",
+        "features": [
+            "Accès aux espaces d'exposition",
+            "Conférences publiques",
+            "Application mobile",
+            "Plan du salon"
+        ],
+        "limitations": {
+            "b2b_meetings": 0,
+            "networking": "Limité"
+        }
+    },
+    {
+        "id": 2,
+        "name": "Basic Pass",
+        "price": 150,
+        "currency": "€",
+        "description": "Pass essentiel pour 1 journée",
+        "features": [
+            "Tout du Free Pass",
+            "2 rendez-vous B2B garantis",
+            "Accès aux pauses café",
+            "Badge visiteur personnalisé"
+        ],
+        "limitations": {
+            "b2b_meetings": 2,
+            "networking": "Standard"
+        }
+    },
+    {
+        "id": 3,
+        "name": "Premium Pass",
+        "price": 350,
+        "currency": "€",
+        "description": "Pass complet pour 2 journées",
+        "features": [
+            "Tout du Basic Pass",
+            "5 rendez-vous B2B garantis",
+            "Ateliers techniques spécialisés",
+            "Déjeuners networking",
+            "Accès zone VIP"
+        ],
+        "popular": True,
+        "limitations": {
+            "b2b_meetings": 5,
+            "networking": "Avancé"
+        }
+    },
+    {
+        "id": 4,
+        "name": "VIP Pass",
+        "price": 750,
+        "currency": "€",
+        "description": "Accès privilégié 3 journées complètes",
+        "features": [
+            "Tout du Premium Pass",
+            "Rendez-vous B2B illimités",
+            "Soirée de gala exclusive",
+            "Conférences privées C-Level",
+            "Service de conciergerie",
+            "Transferts inclus"
+        ],
+        "limitations": {
+            "b2b_meetings": "unlimited",
+            "networking": "Premium"
+        }
+    }
+]
+VISITOR_PACKAGES_JSON, VISITOR_PACKAGES_ETAG = encode_static_payload({"packages": VISITOR_PACKAGES})
+
 @app.get("/api/visitor-packages")
-async def get_visitor_packages():
+async def get_visitor_packages(request: Request):
     """Get visitor packages"""
-    packages = [
-        {
-            "id": 1,
-            "name": "Free Pass",
-            "price": 0,
-            "currency": "€",
-            "description": "Accès gratuit aux espaces d'exposition",
-            "features": [
-                "Accès aux espaces d'exposition",
-                "Conférences publiques",
-                "Application mobile",
-                "Plan du salon"
-            ],
-            "limitations": {
-                "b2b_meetings": 0,
-                "networking": "Limité"
-            }
-        },
-        {
-            "id": 2,
-            "name": "Basic Pass",
-            "price": 150,
-            "currency": "€",
-            "description": "Pass essentiel pour 1 journée",
-            "features": [
-                "Tout du Free Pass",
-                "2 rendez-vous B2B garantis",
-                "Accès aux pauses café",
-                "Badge visiteur personnalisé"
-            ],
-            "limitations": {
-                "b2b_meetings": 2,
-                "networking": "Standard"
-            }
-        },
-        {
-            "id": 3,
-            "name": "Premium Pass",
-            "price": 350,
-            "currency": "€",
-            "description": "Pass complet pour 2 journées",
-            "features": [
-                "Tout du Basic Pass",
-                "5 rendez-vous B2B garantis",
-                "Ateliers techniques spécialisés",
-                "Déjeuners networking",
-                "Accès zone VIP"
-            ],
-            "popular": True,
-            "limitations": {
-                "b2b_meetings": 5,
-                "networking": "Avancé"
-            }
-        },
-        {
-            "id": 4,
-            "name": "VIP Pass",
-            "price": 750,
-            "currency": "€",
-            "description": "Accès privilégié 3 journées complètes",
-            "features": [
-                "Tout du Premium Pass",
-                "Rendez-vous B2B illimités",
-                "Soirée de gala exclusive",
-                "Conférences privées C-Level",
-                "Service de conciergerie",
-                "Transferts inclus"
-            ],
-            "limitations": {
-                "b2b_meetings": "unlimited",
-                "networking": "Premium"
-            }
-        }
-    ]
-    return {"packages": packages}
+    return static_json_response(request, VISITOR_PACKAGES_JSON, VISITOR_PACKAGES_ETAG)
 
 @app.post("/api/visitor-packages/update")
 async def update_visitor_package(data: PackageUpdate, user: dict = Depends(get_current_user)):
     """Update user's visitor package"""
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        conn.execute(
-            'UPDATE users SET visitor_package = ? WHERE id = ?',
-            (data.package_type, user['id'])
-        )
-        conn.commit()
-        conn.close()
+        await execute(UPDATE_VISITOR_PACKAGE_SQL, (data.package_type, user['id']))
+        invalidate_user(user['id'])
         
         return {"message": "Forfait mis à jour avec succès"}
         
     except Exception as e:
-        logger.error(f"Package update error: {str(e)}")
+        logger.error("Package update error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur mise à jour forfait")
 
 # =============================================================================
 # PARTNERSHIP PACKAGES ENDPOINTS
 # =============================================================================
 
+# Catalogue constant : encodé une seule fois au chargement du module
+PARTNERSHIP_PACKAGES = [
+    {
+        "id": 1,
+        "name": "Startup Package",
+        "price": 2500,
+        "currency": "$",
+        "description": "Idéal pour les jeunes entreprises maritimes",
+        "features": [
+            "Stand 6m² (2x3m)",
+            "2 badges exposant",
+            "Listing annuaire digital",
+            "Support technique de base"
+        ],
+        "category": "startup"
+    },
+    {
+        "id": 2,
+        "name": "Silver Package", 
+        "price": 8000,
+        "currency": "$",
+        "description": "Package standard pour exposants confirmés",
+        "features": [
+            "Stand 12m² (3x4m)",
+            "4 badges exposant",
+            "Mobilier standard inclus",
+            "1 session de networking sponsorisée",
+            "Présence catalogue premium"
+        ],
+        "category": "standard"
+    },
+    {
+        "id": 3,
+        "name": "Gold Package",
+        "price": 15000,
+        "currency": "$", 
+        "description": "Package avancé avec visibilité renforcée",
+        "features": [
+            "Stand 20m² (4x5m) - Emplacement premium",
+            "6 badges exposant",
+            "Mobilier sur-mesure",
+            "2 conférences sponsorisées (30min)",
+            "Logo sur supports officiels",
+            "1 cocktail networking privé"
+        ],
+        "popular": True,
+        "category": "premium"
+    },
+    {
+        "id": 4,
+        "name": "Platinum Package",
+        "price": 25000,
+        "currency": "$",
+        "description": "Package prestige - Partenaire officiel",
+        "features": [
+            "Stand 40m² (5x8m) - Hall d'entrée",
+            "10 badges exposant",
+            "Design stand personnalisé",
+            "Keynote session dédiée (45min)",
+            "Mini-site SIPORTS Premium dédié",
+            "Branding événement (logos, panneaux)",
+            "Dîner VIP avec comité d'organisation",
+            "Communiqué de presse co-signé"
+        ],
+        "category": "prestige"
+    }
+]
+PARTNERSHIP_PACKAGES_JSON, PARTNERSHIP_PACKAGES_ETAG = encode_static_payload({"packages": PARTNERSHIP_PACKAGES})
+
 @app.get("/api/partnership-packages")
-async def get_partnership_packages():
+async def get_partnership_packages(request: Request):
     """Get partnership packages"""
-    packages = [
-        {
-            "id": 1,
-            "name": "Startup Package",
-            "price": 2500,
-            "currency": "$",
-            "description": "Idéal pour les jeunes entreprises maritimes",
-            "features": [
-                "Stand 6m² (2x3m)",
-                "2 badges exposant",
-                "Listing annuaire digital",
-                "Support technique de base"
-            ],
-            "category": "startup"
-        },
-        {
-            "id": 2,
-            "name": "Silver Package", 
-            "price": 8000,
-            "currency": "$",
-            "description": "Package standard pour exposants confirmés",
-            "features": [
-                "Stand 12m² (3x4m)",
-                "4 badges exposant",
-                "Mobilier standard inclus",
-                "1 session de networking sponsorisée",
-                "Présence catalogue premium"
-            ],
-            "category": "standard"
-        },
-        {
-            "id": 3,
-            "name": "Gold Package",
-            "price": 15000,
-            "currency": "$", 
-            "description": "Package avancé avec visibilité renforcée",
-            "features": [
-                "Stand 20m² (4x5m) - Emplacement premium",
-                "6 badges exposant",
-                "Mobilier sur-mesure",
-                "2 conférences sponsorisées (30min)",
-                "Logo sur supports officiels",
-                "1 cocktail networking privé"
-            ],
-            "popular": True,
-            "category": "premium"
-        },
-        {
-            "id": 4,
-            "name": "Platinum Package",
-            "price": 25000,
-            "currency": "$",
-            "description": "Package prestige - Partenaire officiel",
-            "features": [
-                "Stand 40m² (5x8m) - Hall d'entrée",
-                "10 badges exposant",
-                "Design stand personnalisé",
-                "Keynote session dédiée (45min)",
-                "Mini-site SIPORTS Premium dédié",
-                "Branding événement (logos, panneaux)",
-                "Dîner VIP avec comité d'organisation",
-                "Communiqué de presse co-signé"
-            ],
-            "category": "prestige"
-        }
-    ]
-    return {"packages": packages}
+    return static_json_response(request, PARTNERSHIP_PACKAGES_JSON, PARTNERSHIP_PACKAGES_ETAG)
 
 # =============================================================================
 # ADMIN ENDPOINTS
@@ -465,89 +735,54 @@ async def get_partnership_packages():
 async def get_admin_stats(admin: dict = Depends(admin_required)):
     """Get admin dashboard statistics"""
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        
-        # Count users by type
-        total_users = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
-        visitors = conn.execute('SELECT COUNT(*) FROM users WHERE user_type = "visitor"').fetchone()[0]
-        exhibitors = conn.execute('SELECT COUNT(*) FROM users WHERE user_type = "exhibitor"').fetchone()[0]
-        partners = conn.execute('SELECT COUNT(*) FROM users WHERE user_type = "partner"').fetchone()[0]
+        # Comptages par type et par statut en un seul parcours de la table
+        stats = await fetch_one(ADMIN_STATS_SQL)
         
-        # Count by status
-        pending = conn.execute('SELECT COUNT(*) FROM users WHERE status = "pending"').fetchone()[0]
-        validated = conn.execute('SELECT COUNT(*) FROM users WHERE status = "validated"').fetchone()[0]
-        rejected = conn.execute('SELECT COUNT(*) FROM users WHERE status = "rejected"').fetchone()[0]
-        
-        conn.close()
-        
-        return {
-            "total_users": total_users,
-            "visitors": visitors,
-            "exhibitors": exhibitors,
-            "partners": partners,
-            "pending": pending,
-            "validated": validated,
-            "rejected": rejected
-        }
+        return dict(stats)
         
     except Exception as e:
-        logger.error(f"Admin stats error: {str(e)}")
+        logger.error("Admin stats error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur statistiques")
 
 @app.get("/api/admin/users/pending")
 async def get_pending_users(admin: dict = Depends(admin_required)):
     """Get users pending validation"""
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        conn.row_factory = sqlite3.Row
-        
-        users = conn.execute('''
-            SELECT id, email, first_name, last_name, company, user_type, created_at
-            FROM users WHERE status = 'pending'
-            ORDER BY created_at DESC
-        ''').fetchall()
-        conn.close()
+        users = await fetch_all(PENDING_USERS_SQL)
         
         return {"users": [dict(user) for user in users]}
         
     except Exception as e:
-        logger.error(f"Pending users error: {str(e)}")
+        logger.error("Pending users error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur récupération utilisateurs")
 
+async def set_user_status(user_id: int, status: str):
+    """Change a user's validation status and drop its cached row"""
+    await execute(SET_USER_STATUS_SQL, (status, user_id))
+    invalidate_user(user_id)
+
 @app.post("/api/admin/users/{user_id}/validate")
 async def validate_user(user_id: int, admin: dict = Depends(admin_required)):
     """Validate a user"""
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        conn.execute(
-            'UPDATE users SET status = "validated" WHERE id = ?',
-            (user_id,)
-        )
-        conn.commit()
-        conn.close()
+        await set_user_status(user_id, 'validated')
         
         return {"message": "Utilisateur validé avec succès"}
         
     except Exception as e:
-        logger.error(f"User validation error: {str(e)}")
+        logger.error("User validation error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur validation utilisateur")
 
 @app.post("/api/admin/users/{user_id}/reject") 
 async def reject_user(user_id: int, admin: dict = Depends(admin_required)):
     """Reject a user"""
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        conn.execute(
-            'UPDATE users SET status = "rejected" WHERE id = ?',
-            (user_id,)
-        )
-        conn.commit()
-        conn.close()
+        await set_user_status(user_id, 'rejected')
         
         return {"message": "Utilisateur rejeté"}
         
     except Exception as e:
-        logger.error(f"User rejection error: {str(e)}")
+        logger.error("User rejection error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur rejet utilisateur")
 
 # =============================================================================
@@ -558,7 +793,8 @@ async def reject_user(user_id: int, admin: dict = Depends(admin_required)):
 async def ai_find_matches(request: MatchingRequest, user: dict = Depends(get_current_user)):
     """Recherche de matches avec IA avancée"""
     try:
-        matches = ai_matching_service.find_matches(request)
+        # Scoring NumPy + SQLite (libèrent le GIL) : exécuté dans le threadpool
+        matches = await run_in_threadpool(ai_matching_service.find_matches, request)
         
         # Conversion pour la réponse API
         matches_data = []
@@ -577,7 +813,7 @@ async def ai_find_matches(request: MatchingRequest, user: dict = Depends(get_cur
         return {"matches": matches_data, "total": len(matches_data)}
         
     except Exception as e:
-        logger.error(f"AI matching error: {str(e)}")
+        logger.error("AI matching error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur matching IA")
 
 @app.get("/api/ai/recommendations/{user_id}")
@@ -587,7 +823,9 @@ async def get_proactive_recommendations(user_id: int, user: dict = Depends(get_c
         if user['id'] != user_id and user['user_type'] != 'admin':
             raise HTTPException(status_code=403, detail="Accès non autorisé")
         
-        recommendations = ai_matching_service.generate_proactive_recommendations(user_id)
+        recommendations = await run_in_threadpool(
+            ai_matching_service.generate_proactive_recommendations, user_id
+        )
         
         recommendations_data = []
         for rec in recommendations:
@@ -605,69 +843,75 @@ async def get_proactive_recommendations(user_id: int, user: dict = Depends(get_c
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"AI recommendations error: {str(e)}")
+        logger.error("AI recommendations error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur recommandations IA")
 
+# Colonnes écrites par la mise à jour du profil détaillé
+DETAILED_PROFILE_COLUMNS = (
+    'sectors_activity', 'products_services', 'participation_objectives',
+    'interest_themes', 'visit_objectives', 'skills_expertise',
+    'matching_criteria', 'looking_for', 'budget_range', 'company_size',
+    'geographic_location', 'meeting_availability', 'languages',
+    'certifications', 'updated_at'
+)
+UPSERT_DETAILED_PROFILE_SQL = f'''
+    INSERT INTO user_profiles_detailed (user_id, {', '.join(DETAILED_PROFILE_COLUMNS)})
+    VALUES (?, {', '.join('?' for _ in DETAILED_PROFILE_COLUMNS)})
+    ON CONFLICT(user_id) DO UPDATE SET
+    {', '.join(f'{column} = excluded.{column}' for column in DETAILED_PROFILE_COLUMNS)}
+'''
+
 @app.post("/api/ai/profile/detailed")
 async def update_detailed_profile(profile: UserProfileDetailed, user: dict = Depends(get_current_user)):
     """Mise à jour du profil détaillé pour l'IA"""
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        
         # Conversion des listes en JSON
         profile_data = {
-            'sectors_activity': json.dumps(profile.sectors_activity),
-            'products_services': json.dumps(profile.products_services),
-            'participation_objectives': json.dumps(profile.participation_objectives),
-            'interest_themes': json.dumps(profile.interest_themes),
-            'visit_objectives': json.dumps(profile.visit_objectives),
-            'skills_expertise': json.dumps(profile.skills_expertise),
-            'matching_criteria': json.dumps(profile.matching_criteria),
-            'looking_for': json.dumps(profile.looking_for),
+            'sectors_activity': json_dumps(profile.sectors_activity),
+            'products_services': json_dumps(profile.products_services),
+            'participation_objectives': json_dumps(profile.participation_objectives),
+            'interest_themes': json_dumps(profile.interest_themes),
+            'visit_objectives': json_dumps(profile.visit_objectives),
+            'skills_expertise': json_dumps(profile.skills_expertise),
+            'matching_criteria': json_dumps(profile.matching_criteria),
+            'looking_for': json_dumps(profile.looking_for),
             'budget_range': profile.budget_range,
             'company_size': profile.company_size,
-            'geographic_location': json.dumps(profile.geographic_location),
+            'geographic_location': json_dumps(profile.geographic_location),
             'meeting_availability': profile.meeting_availability,
-            'languages': json.dumps(profile.languages),
-            'certifications': json.dumps(profile.certifications),
+            'languages': json_dumps(profile.languages),
+            'certifications': json_dumps(profile.certifications),
             'updated_at': datetime.utcnow().isoformat()
         }
         
-        # Vérifier si le profil existe
-        existing = conn.execute(
-            'SELECT user_id FROM user_profiles_detailed WHERE user_id = ?',
-            (user['id'],)
-        ).fetchone()
-        
-        if existing:
-            # Mise à jour
-            set_clause = ', '.join([f"{key} = ?" for key in profile_data.keys()])
-            values = list(profile_data.values()) + [user['id']]
-            
-            conn.execute(
-                f'UPDATE user_profiles_detailed SET {set_clause} WHERE user_id = ?',
-                values
-            )
-        else:
-            # Insertion
-            profile_data['user_id'] = user['id']
-            columns = ', '.join(profile_data.keys())
-            placeholders = ', '.join(['?' for _ in profile_data.values()])
-            
-            conn.execute(
-                f'INSERT INTO user_profiles_detailed ({columns}) VALUES ({placeholders})',
-                list(profile_data.values())
-            )
-        
-        conn.commit()
-        conn.close()
+        # Insertion ou mise à jour en une seule instruction
+        await execute(
+            UPSERT_DETAILED_PROFILE_SQL,
+            (user['id'], *(profile_data[column] for column in DETAILED_PROFILE_COLUMNS))
+        )
         
         return {"message": "Profil détaillé mis à jour avec succès"}
         
     except Exception as e:
-        logger.error(f"Profile update error: {str(e)}")
+        logger.error("Profile update error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur mise à jour profil")
 
+# Colonnes JSON du profil détaillé (matching_criteria est la seule colonne objet)
+PROFILE_JSON_LIST_FIELDS = (
+    'sectors_activity', 'products_services', 'participation_objectives',
+    'interest_themes', 'visit_objectives', 'skills_expertise',
+    'looking_for', 'geographic_location', 'languages', 'certifications'
+)
+
+def decode_json_field(value, default):
+    """Décode une colonne JSON, valeur par défaut si vide ou invalide"""
+    if not value:
+        return default
+    try:
+        return json_loads(value)
+    except (ValueError, TypeError):
+        return default
+
 @app.get("/api/ai/profile/detailed/{user_id}")
 async def get_detailed_profile(user_id: int, user: dict = Depends(get_current_user)):
     """Récupération du profil détaillé"""
@@ -675,14 +919,10 @@ async def get_detailed_profile(user_id: int, user: dict = Depends(get_current_us
         if user['id'] != user_id and user['user_type'] != 'admin':
             raise HTTPException(status_code=403, detail="Accès non autorisé")
         
-        conn = sqlite3.connect(DATABASE_URL)
-        conn.row_factory = sqlite3.Row
-        
-        profile = conn.execute(
+        profile = await fetch_one(
             'SELECT * FROM user_profiles_detailed WHERE user_id = ?',
             (user_id,)
-        ).fetchone()
-        conn.close()
+        )
         
         if not profile:
             # Retourner un profil vide si pas encore créé
@@ -706,30 +946,37 @@ async def get_detailed_profile(user_id: int, user: dict = Depends(get_current_us
         
         # Conversion des données JSON
         profile_data = dict(profile)
-        json_fields = [
-            'sectors_activity', 'products_services', 'participation_objectives',
-            'interest_themes', 'visit_objectives', 'skills_expertise',
-            'matching_criteria', 'looking_for', 'geographic_location',
-            'languages', 'certifications'
-        ]
-        
-        for field in json_fields:
-            if profile_data.get(field):
-                try:
-                    profile_data[field] = json.loads(profile_data[field])
-                except:
-                    profile_data[field] = [] if field != 'matching_criteria' else {}
-            else:
-                profile_data[field] = [] if field != 'matching_criteria' else {}
+        profile_data.update({
+            field: decode_json_field(profile_data.get(field), [])
+            for field in PROFILE_JSON_LIST_FIELDS
+        })
+        profile_data['matching_criteria'] = decode_json_field(profile_data.get('matching_criteria'), {})
         
         return profile_data
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Profile get error: {str(e)}")
+        logger.error("Profile get error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur récupération profil")
 
+FEEDBACK_BATCH_SIZE = 64
+
+async def drain_feedback_queue(queue: asyncio.Queue):
+    """Consomme la file des feedbacks et les enregistre par lots (une transaction par lot)"""
+    while True:
+        batch = [await queue.get()]
+        while len(batch) < FEEDBACK_BATCH_SIZE and not queue.empty():
+            batch.append(queue.get_nowait())
+        
+        try:
+            await run_in_threadpool(ai_matching_service.update_interaction_feedback_batch, batch)
+        except Exception as e:
+            logger.error("Interaction feedback batch error: %s", e)
+        finally:
+            for _ in batch:
+                queue.task_done()
+
 @app.post("/api/ai/interaction/feedback")
 async def record_interaction_feedback(
     request: Request,
@@ -742,14 +989,15 @@ async def record_interaction_feedback(
         interaction_type = request.query_params.get('interaction_type')
         success = int(request.query_params.get('success'))
         
-        ai_matching_service.update_interaction_feedback(
-            user['id'], target_user_id, interaction_type, success
+        # Enregistrement différé : le consommateur de fond écrit les feedbacks par lots
+        request.app.state.feedback_queue.put_nowait(
+            (user['id'], target_user_id, interaction_type, success)
         )
         
         return {"message": "Feedback enregistré pour l'amélioration de l'IA"}
         
     except Exception as e:
-        logger.error(f"Interaction feedback error: {str(e)}")
+        logger.error("Interaction feedback error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur enregistrement feedback")
 
 # =============================================================================
@@ -771,185 +1019,348 @@ class MessageResponse(BaseModel):
     created_at: str
     sender_name: str
 
+# Requêtes de la messagerie : chaînes constantes, compilées une fois par connexion
+# grâce au cache d'instructions de sqlite3 (cached_statements du pool)
+
+# Colonnes d'un message dans l'ordre lu par message_row (1er paramètre : l'utilisateur courant)
+MESSAGE_COLUMNS = '''
+    m.id, m.sender_id, m.recipient_id, m.content, m.message_type, m.is_read,
+    m.created_at, u.first_name, u.last_name, m.sender_id = ? AS is_own_message
+'''
+
+INSERT_MESSAGE_SQL = '''
+    INSERT INTO messages (sender_id, recipient_id, content, message_type)
+    VALUES (?, ?, ?, ?)
+'''
+
+VALIDATED_RECIPIENT_SQL = "SELECT id, first_name, last_name FROM users WHERE id = ? AND status = 'validated'"
+
+CONVERSATIONS_SQL = '''
+    WITH thread AS (
+        SELECT id, content, created_at,
+               CASE WHEN sender_id = :user_id THEN recipient_id ELSE sender_id END AS contact_id,
+               (recipient_id = :user_id AND NOT is_read) AS unread
+        FROM messages
+        WHERE sender_id = :user_id OR recipient_id = :user_id
+    ),
+    ranked AS (
+        SELECT contact_id, content, created_at,
+               ROW_NUMBER() OVER latest AS rn,
+               SUM(unread) OVER (latest ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING) AS unread_count
+        FROM thread
+        WINDOW latest AS (PARTITION BY contact_id ORDER BY created_at DESC, id DESC)
+    ),
+    convs AS (
+        SELECT contact_id, content, created_at, unread_count
+        FROM ranked
+        WHERE rn = 1
+    )
+    SELECT c.contact_id, u.first_name, u.last_name, u.company, u.user_type,
+           c.content AS last_message, c.created_at AS last_message_at, c.unread_count
+    FROM convs c
+    JOIN users u ON u.id = c.contact_id
+    ORDER BY c.created_at DESC
+'''
+
+MARK_CONVERSATION_READ_SQL = '''
+    UPDATE messages SET is_read = TRUE 
+    WHERE sender_id = ? AND recipient_id = ? AND is_read = FALSE
+'''
+
+CONVERSATION_PAGE_SQL = f'''
+    SELECT {MESSAGE_COLUMNS}
+    FROM messages m
+    JOIN users u ON u.id = m.sender_id
+    WHERE ((m.sender_id = ? AND m.recipient_id = ?) 
+        OR (m.sender_id = ? AND m.recipient_id = ?))
+      AND (? IS NULL OR m.id < ?)
+    ORDER BY m.id DESC
+    LIMIT ?
+'''
+
+SEARCH_MESSAGES_FTS_SQL = f'''
+    SELECT {MESSAGE_COLUMNS}
+    FROM messages_fts
+    JOIN messages m ON m.id = messages_fts.rowid
+    JOIN users u ON u.id = m.sender_id
+    WHERE messages_fts MATCH ? AND (m.sender_id = ? OR m.recipient_id = ?)
+    ORDER BY bm25(messages_fts)
+    LIMIT ?
+'''
+
+SEARCH_MESSAGES_LIKE_SQL = f'''
+    SELECT {MESSAGE_COLUMNS}
+    FROM messages m
+    JOIN users u ON u.id = m.sender_id
+    WHERE m.content LIKE ? ESCAPE '\\' AND (m.sender_id = ? OR m.recipient_id = ?)
+    ORDER BY m.created_at DESC
+    LIMIT ?
+'''
+
+# Compteur maintenu par les triggers messages_unread_* (pas de ligne : aucun message reçu)
+UNREAD_COUNT_SQL = 'SELECT unread FROM user_unread WHERE user_id = ?'
+
+# Compteurs de non-lus récents (badge interrogé en boucle) : user_id -> (échéance monotonic, nombre)
+UNREAD_CACHE_TTL = 2.0
+UNREAD_CACHE_SIZE = 10_000
+unread_cache = {}
+
+MESSAGE_BATCH_SIZE = 500
+
+def insert_messages_batch(rows: list) -> list:
+    """Insert messages in a single transaction (blocking)
+    
+    Returns, in order, each message id or the exception that rejected its row.
+    """
+    try:
+        with db_pool.connection() as conn:
+            # Un INSERT par ligne pour récupérer chaque lastrowid, mais un seul commit (un seul fsync)
+            message_ids = [
+                conn.execute(INSERT_MESSAGE_SQL, row).lastrowid
+                for row in rows
+            ]
+            conn.commit()
+            return message_ids
+    except sqlite3.Error as e:
+        if len(rows) == 1:
+            return [e]
+        logger.warning("Message batch rejected, retrying row by row: %s", e)
+    
+    # Lot annulé : nouvel essai ligne à ligne, seules les lignes fautives échouent
+    results = []
+    with db_pool.connection() as conn:
+        for row in rows:
+            try:
+                results.append(conn.execute(INSERT_MESSAGE_SQL, row).lastrowid)
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                results.append(e)
+    return results
+
+async def drain_message_queue(queue: asyncio.Queue):
+    """Consomme la file des envois et insère les messages par lots (une transaction par lot)"""
+    while True:
+        batch = [await queue.get()]
+        while len(batch) < MESSAGE_BATCH_SIZE and not queue.empty():
+            batch.append(queue.get_nowait())
+        
+        try:
+            results = await run_in_threadpool(insert_messages_batch, [row for row, _ in batch])
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        except Exception as e:
+            logger.error("Message batch error: %s", e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+def message_row(cursor, row) -> dict:
+    """Row factory building the API payload of a MESSAGE_COLUMNS row"""
+    (message_id, sender_id, recipient_id, content, message_type, is_read,
+     created_at, first_name, last_name, is_own_message) = row
+    return {
+        "id": message_id,
+        "sender_id": sender_id,
+        "recipient_id": recipient_id,
+        "content": content,
+        "message_type": message_type,
+        "is_read": bool(is_read),
+        "created_at": created_at,
+        "sender_name": f"{first_name} {last_name}",
+        "is_own_message": bool(is_own_message)
+    }
+
+def conversation_row(cursor, row) -> dict:
+    """Row factory building the API payload of a conversation list row"""
+    (contact_id, first_name, last_name, company, user_type,
+     last_message, last_message_at, unread_count) = row
+    return {
+        "contact_id": contact_id,
+        "contact_name": f"{first_name} {last_name}",
+        "company": company,
+        "user_type": user_type,
+        "last_message": last_message,
+        "last_message_at": last_message_at,
+        "unread_count": unread_count
+    }
+
 @app.post("/api/messages/send")
 async def send_message(message: MessageCreate, user: dict = Depends(get_current_user)):
     """Envoyer un message à un autre utilisateur"""
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        
         # Vérifier que le destinataire existe
-        recipient = conn.execute(
-            'SELECT id, first_name, last_name FROM users WHERE id = ? AND status = "validated"',
-            (message.recipient_id,)
-        ).fetchone()
+        recipient = await fetch_one(VALIDATED_RECIPIENT_SQL, (message.recipient_id,))
         
         if not recipient:
             raise HTTPException(status_code=404, detail="Destinataire non trouvé")
         
-        # Créer la table des messages si elle n'existe pas
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sender_id INTEGER NOT NULL,
-                recipient_id INTEGER NOT NULL,
-                content TEXT NOT NULL,
-                message_type TEXT DEFAULT 'text',
-                is_read BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (sender_id) REFERENCES users(id),
-                FOREIGN KEY (recipient_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Insérer le message
-        cursor = conn.execute('''
-            INSERT INTO messages (sender_id, recipient_id, content, message_type)
-            VALUES (?, ?, ?, ?)
-        ''', (user['id'], message.recipient_id, message.content, message.message_type))
-        
-        message_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        # Insérer le message via l'écrivain de fond, qui regroupe les envois simultanés
+        future = asyncio.get_running_loop().create_future()
+        app.state.message_queue.put_nowait(
+            ((user['id'], message.recipient_id, message.content, message.message_type), future)
+        )
+        message_id = await future
         
-        # Enregistrer l'interaction pour l'IA
-        ai_matching_service.update_interaction_feedback(
-            user['id'], message.recipient_id, 'message', 1
+        # Enregistrer l'interaction pour l'IA (écrite par lots par le consommateur de fond)
+        app.state.feedback_queue.put_nowait(
+            (user['id'], message.recipient_id, 'message', 1)
         )
+        unread_cache.pop(message.recipient_id, None)
         
         return {"message_id": message_id, "status": "sent", "message": "Message envoyé avec succès"}
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Send message error: {str(e)}")
+        logger.error("Send message error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur envoi message")
 
 @app.get("/api/messages/conversations")
 async def get_conversations(user: dict = Depends(get_current_user)):
     """Récupérer la liste des conversations de l'utilisateur"""
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        conn.row_factory = sqlite3.Row
-        
-        # Récupérer les conversations avec le dernier message
-        conversations = conn.execute('''
-            SELECT DISTINCT
-                CASE 
-                    WHEN m.sender_id = ? THEN m.recipient_id 
-                    ELSE m.sender_id 
-                END as contact_id,
-                u.first_name,
-                u.last_name,
-                u.company,
-                u.user_type,
-                (SELECT content FROM messages m2 
-                 WHERE (m2.sender_id = ? AND m2.recipient_id = contact_id) 
-                    OR (m2.recipient_id = ? AND m2.sender_id = contact_id)
-                 ORDER BY m2.created_at DESC LIMIT 1) as last_message,
-                (SELECT created_at FROM messages m2 
-                 WHERE (m2.sender_id = ? AND m2.recipient_id = contact_id) 
-                    OR (m2.recipient_id = ? AND m2.sender_id = contact_id)
-                 ORDER BY m2.created_at DESC LIMIT 1) as last_message_at,
-                (SELECT COUNT(*) FROM messages m2 
-                 WHERE m2.sender_id = contact_id AND m2.recipient_id = ? AND m2.is_read = FALSE) as unread_count
-            FROM messages m
-            JOIN users u ON u.id = CASE 
-                WHEN m.sender_id = ? THEN m.recipient_id 
-                ELSE m.sender_id 
-            END
-            WHERE m.sender_id = ? OR m.recipient_id = ?
-            ORDER BY last_message_at DESC
-        ''', (user['id'], user['id'], user['id'], user['id'], user['id'], user['id'], user['id'], user['id'], user['id'])).fetchall()
-        
-        conn.close()
-        
-        conversations_data = []
-        for conv in conversations:
-            conversations_data.append({
-                "contact_id": conv['contact_id'],
-                "contact_name": f"{conv['first_name']} {conv['last_name']}",
-                "company": conv['company'],
-                "user_type": conv['user_type'],
-                "last_message": conv['last_message'],
-                "last_message_at": conv['last_message_at'],
-                "unread_count": conv['unread_count']
-            })
+        # Dernier message et non-lus par contact en un seul parcours (un seul tri de fenêtre),
+        # puis une seule jointure sur la clé primaire de users, une ligne par contact
+        conversations = await fetch_all(
+            CONVERSATIONS_SQL, {"user_id": user['id']}, row_factory=conversation_row
+        )
         
-        return {"conversations": conversations_data}
+        return {"conversations": conversations}
         
     except Exception as e:
-        logger.error(f"Get conversations error: {str(e)}")
+        logger.error("Get conversations error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur récupération conversations")
 
+def read_conversation(user_id: int, contact_id: int, before_id: Optional[int] = None, limit: int = 100) -> list:
+    """Mark a conversation as read and return a page of its messages (blocking)"""
+    with db_pool.connection() as conn:
+        # Marquage et lecture dans une même transaction, verrou d'écriture pris d'emblée
+        conn.execute('BEGIN IMMEDIATE')
+        
+        # Marquer les messages comme lus (seules les lignes non lues sont réécrites)
+        conn.execute(MARK_CONVERSATION_READ_SQL, (contact_id, user_id))
+    
+        # Page des messages les plus récents avant before_id (keyset), convertis au format de l'API
+        cursor = conn.cursor()
+        cursor.row_factory = message_row
+        messages = cursor.execute(CONVERSATION_PAGE_SQL, (user_id, user_id, contact_id, contact_id, user_id,
+              before_id, before_id, limit)).fetchall()
+    
+        conn.commit()
+        
+        # Ordre chronologique pour l'affichage
+        messages.reverse()
+        return messages
+
 @app.get("/api/messages/conversation/{contact_id}")
-async def get_conversation_messages(contact_id: int, user: dict = Depends(get_current_user)):
-    """Récupérer les messages d'une conversation spécifique"""
+async def get_conversation_messages(
+    contact_id: int,
+    before_id: Optional[int] = None,
+    limit: int = 100,
+    user: dict = Depends(get_current_user)
+):
+    """Récupérer les messages d'une conversation spécifique (paginés, plus récents d'abord)"""
     try:
-        conn = sqlite3.connect(DATABASE_URL)
-        conn.row_factory = sqlite3.Row
+        messages = await run_in_threadpool(
+            read_conversation, user['id'], contact_id, before_id, max(1, min(limit, 500))
+        )
+        unread_cache.pop(user['id'], None)
         
-        # Marquer les messages comme lus
-        conn.execute('''
-            UPDATE messages SET is_read = TRUE 
-            WHERE sender_id = ? AND recipient_id = ?
-        ''', (contact_id, user['id']))
-        
-        # Récupérer les messages
-        messages = conn.execute('''
-            SELECT 
-                m.*,
-                u.first_name,
-                u.last_name
-            FROM messages m
-            JOIN users u ON u.id = m.sender_id
-            WHERE (m.sender_id = ? AND m.recipient_id = ?) 
-               OR (m.sender_id = ? AND m.recipient_id = ?)
-            ORDER BY m.created_at ASC
-        ''', (user['id'], contact_id, contact_id, user['id'])).fetchall()
+        return {
+            "messages": messages,
+            "next_before_id": messages[0]['id'] if messages else None
+        }
         
-        conn.commit()
-        conn.close()
-        
-        messages_data = []
-        for msg in messages:
-            messages_data.append({
-                "id": msg['id'],
-                "sender_id": msg['sender_id'],
-                "recipient_id": msg['recipient_id'],
-                "content": msg['content'],
-                "message_type": msg['message_type'],
-                "is_read": bool(msg['is_read']),
-                "created_at": msg['created_at'],
-                "sender_name": f"{msg['first_name']} {msg['last_name']}",
-                "is_own_message": msg['sender_id'] == user['id']
-            })
+    except Exception as e:
+        logger.error("Get messages error: %s", e)
+        raise HTTPException(status_code=500, detail="Erreur récupération messages")
+
+def search_messages(user_id: int, query: str, limit: int = 50) -> list:
+    """Messages of a user matching the query words, best matches first (blocking)"""
+    words = query.split()
+    if not words:
+        return []
+    
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = message_row
+        
+        if MESSAGES_FTS_ENABLED:
+            # Mots entre guillemets : la saisie utilisateur n'est pas interprétée comme syntaxe FTS5
+            match = ' '.join('"%s"' % word.replace('"', '""') for word in words)
+            return cursor.execute(SEARCH_MESSAGES_FTS_SQL, (user_id, match, user_id, user_id, limit)).fetchall()
+        
+        # Jokers LIKE échappés : la saisie est cherchée telle quelle, comme avec FTS5
+        pattern = query.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return cursor.execute(SEARCH_MESSAGES_LIKE_SQL, (user_id, f'%{pattern}%', user_id, user_id, limit)).fetchall()
+
+@app.get("/api/messages/search")
+async def search_user_messages(q: str, limit: int = 50, user: dict = Depends(get_current_user)):
+    """Rechercher dans les messages de l'utilisateur"""
+    try:
+        messages = await run_in_threadpool(search_messages, user['id'], q, max(1, min(limit, 200)))
         
-        return {"messages": messages_data}
+        return {"messages": messages}
         
     except Exception as e:
-        logger.error(f"Get messages error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Erreur récupération messages")
+        logger.error("Search messages error: %s", e)
+        raise HTTPException(status_code=500, detail="Erreur recherche messages")
+
+# Matches servant aux suggestions : user_id -> (échéance monotonic, {matched_user_id: MatchResult})
+SUGGESTION_MATCHES_TTL = 300.0
+SUGGESTION_MATCHES_SIZE = 10_000
+suggestion_matches = {}
+# Verrous de calcul par utilisateur : user_id -> [verrou, requêtes qui le détiennent ou l'attendent]
+suggestion_locks = {}
+
+async def conversation_matches(user_id: int) -> dict:
+    """Matches of a user indexed by matched_user_id, computed at most once per TTL"""
+    cached = suggestion_matches.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    
+    # Un seul calcul par utilisateur : les requêtes concurrentes attendent le premier.
+    # Le verrou n'est retiré qu'une fois libéré de tout détenteur et de toute attente.
+    entry = suggestion_locks.setdefault(user_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            cached = suggestion_matches.get(user_id)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+            
+            request = MatchingRequest(
+                user_id=user_id,
+                match_types=['all'],
+                limit=1
+            )
+            matches = await run_in_threadpool(ai_matching_service.find_matches, request)
+            by_contact = {match.matched_user_id: match for match in matches}
+            
+            if len(suggestion_matches) >= SUGGESTION_MATCHES_SIZE:
+                suggestion_matches.pop(next(iter(suggestion_matches)))
+            suggestion_matches[user_id] = (time.monotonic() + SUGGESTION_MATCHES_TTL, by_contact)
+            return by_contact
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and suggestion_locks.get(user_id) is entry:
+            del suggestion_locks[user_id]
 
 @app.get("/api/messages/suggestions/{contact_id}")
 async def get_conversation_suggestions(contact_id: int, user: dict = Depends(get_current_user)):
     """Obtenir des suggestions de sujets de conversation basées sur l'IA"""
     try:
-        # Utiliser le service IA pour générer des suggestions
-        request = MatchingRequest(
-            user_id=user['id'],
-            match_types=['all'],
-            limit=1
-        )
-        
-        # Trouver les informations de compatibilité avec ce contact
-        matches = ai_matching_service.find_matches(request)
-        
-        # Rechercher si ce contact fait partie des matches
-        contact_match = None
-        for match in matches:
-            if match.matched_user_id == contact_id:
-                contact_match = match
-                break
+        # Trouver les informations de compatibilité avec ce contact (matches IA mis en cache)
+        contact_match = (await conversation_matches(user['id'])).get(contact_id)
         
         if contact_match:
             suggestions = contact_match.suggested_conversation_topics
@@ -966,7 +1377,7 @@ async def get_conversation_suggestions(contact_id: int, user: dict = Depends(get
         return {"suggestions": suggestions}
         
     except Exception as e:
-        logger.error(f"Conversation suggestions error: {str(e)}")
+        logger.error("Conversation suggestions error: %s", e)
         # Fallback avec suggestions génériques
         return {
             "suggestions": [
@@ -981,19 +1392,22 @@ async def get_conversation_suggestions(contact_id: int, user: dict = Depends(get
 async def get_unread_messages_count(user: dict = Depends(get_current_user)):
     """Compter les messages non lus"""
     try:
-        conn = sqlite3.connect(DATABASE_URL)
+        now = time.monotonic()
+        cached = unread_cache.get(user['id'])
+        if cached and cached[0] > now:
+            return {"unread_count": cached[1]}
         
-        count = conn.execute(
-            'SELECT COUNT(*) FROM messages WHERE recipient_id = ? AND is_read = FALSE',
-            (user['id'],)
-        ).fetchone()[0]
+        row = await fetch_one(UNREAD_COUNT_SQL, (user['id'],))
+        count = row[0] if row else 0
         
-        conn.close()
+        if len(unread_cache) >= UNREAD_CACHE_SIZE:
+            unread_cache.pop(next(iter(unread_cache)))
+        unread_cache[user['id']] = (now + UNREAD_CACHE_TTL, count)
         
         return {"unread_count": count}
         
     except Exception as e:
-        logger.error(f"Unread count error: {str(e)}")
+        logger.error("Unread count error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur comptage messages non lus")
 
 # =============================================================================
@@ -1005,11 +1419,11 @@ async def chat_endpoint(request: ChatRequest):
     """Main AI chatbot endpoint"""
     try:
         response = await siports_ai_service.generate_response(request)
-        logger.info(f"Chatbot response generated for context: {request.context_type}")
+        logger.info("Chatbot response generated for context: %s", request.context_type)
         return response
         
     except Exception as e:
-        logger.error(f"Chatbot error: {str(e)}")
+        logger.error("Chatbot error: %s", e)
         raise HTTPException(status_code=500, detail="Erreur chatbot")
 
 @app.post("/api/chat/exhibitor", response_model=ChatResponse)
@@ -1045,7 +1459,7 @@ async def chatbot_health_check():
             "test_response_length": len(response.response)
         }
     except Exception as e:
-        logger.error(f"Chatbot health check failed: {str(e)}")
+        logger.error("Chatbot health check failed: %s", e)
         return {"status": "unhealthy", "error": str(e)}
 
 # =============================================================================
@@ -1070,9 +1484,22 @@ async def health_check():
 async def startup_event():
     """Initialize application on startup"""
     logger.info("SIPORTS v2.0 API starting...")
-    logger.info(f"Database: {DATABASE_URL}")
+    logger.info("Database: %s", DATABASE_URL)
+    db_pool.warm()
+    app.state.feedback_queue = asyncio.Queue()
+    app.state.feedback_task = asyncio.create_task(drain_feedback_queue(app.state.feedback_queue))
+    app.state.message_queue = asyncio.Queue()
+    app.state.message_task = asyncio.create_task(drain_message_queue(app.state.message_queue))
     logger.info("AI Chatbot service initialized")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush pending background work before exit"""
+    await app.state.message_queue.join()
+    app.state.message_task.cancel()
+    await app.state.feedback_queue.join()
+    app.state.feedback_task.cancel()
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8001))
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool de connexions SQLite - SIPORTS v2.0
+Connexions ouvertes une fois (WAL + pragmas) et partagées par l'API et le service IA
+"""
+
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+# =============================================================================
+# POOL DE CONNEXIONS SQLITE
+# =============================================================================
+
+class SQLitePool:
+    """Pool de connexions SQLite ouvertes une fois et réutilisées entre les requêtes"""
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-65536",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA busy_timeout=5000",
+    )
+
+    def __init__(self, db_path: str, size: int = 8, timeout: float = 30.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._connections = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._connections.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def warm(self):
+        """Charge le schéma sur chaque connexion pour que les premières requêtes n'en paient pas le coût"""
+        borrowed = [self._connections.get(timeout=self.timeout) for _ in range(self._connections.maxsize)]
+        try:
+            for conn in borrowed:
+                conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        finally:
+            for conn in borrowed:
+                self._connections.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Emprunte une connexion du pool et la restitue en fin de bloc"""
+        try:
+            conn = self._connections.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Pool de connexions SQLite épuisé") from None
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._connections.put(conn)
@@ -1,4 +1,5 @@
 import requests
+import os
 import sys
 import json
 from datetime import datetime
@@ -9,12 +10,15 @@ class PostgreSQLAPITester:
         self.tests_run = 0
         self.tests_passed = 0
         self.created_status_ids = []
+        # Session partagée : connexions HTTP réutilisées (keep-alive) entre les tests
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        # Corps des réponses affichés uniquement en mode verbeux (VERBOSE=1)
+        self.verbose = os.environ.get('VERBOSE') == '1'
 
     def run_test(self, name, method, endpoint, expected_status, data=None, headers=None):
         """Run a single API test"""
         url = f"{self.base_url}/{endpoint}"
-        if headers is None:
-            headers = {'Content-Type': 'application/json'}
 
         self.tests_run += 1
         print(f"\n🔍 Testing {name}...")
@@ -22,13 +26,13 @@ class PostgreSQLAPITester:
         
         try:
             if method == 'GET':
-                response = requests.get(url, headers=headers, timeout=10)
+                response = self.session.get(url, headers=headers, timeout=10)
             elif method == 'POST':
-                response = requests.post(url, json=data, headers=headers, timeout=10)
+                response = self.session.post(url, json=data, headers=headers, timeout=10)
             elif method == 'PUT':
-                response = requests.put(url, json=data, headers=headers, timeout=10)
+                response = self.session.put(url, json=data, headers=headers, timeout=10)
             elif method == 'DELETE':
-                response = requests.delete(url, headers=headers, timeout=10)
+                response = self.session.delete(url, headers=headers, timeout=10)
 
             success = response.status_code == expected_status
             if success:
@@ -36,10 +40,12 @@ class PostgreSQLAPITester:
                 print(f"✅ Passed - Status: {response.status_code}")
                 try:
                     response_data = response.json()
-                    print(f"   Response: {json.dumps(response_data, indent=2, default=str)}")
+                    if self.verbose:
+                        print(f"   Response: {json.dumps(response_data, indent=2, default=str)}")
                     return True, response_data
                 except:
-                    print(f"   Response: {response.text}")
+                    if self.verbose:
+                        print(f"   Response: {response.text}")
                     return True, {}
             else:
                 print(f"❌ Failed - Expected {expected_status}, got {response.status_code}")
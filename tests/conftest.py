@@ -0,0 +1,66 @@
+"""Configuration commune des tests du backend
+
+Les modules du backend s'importent à plat (`import server`) et ouvrent leur base
+SQLite à l'import via des chemins relatifs (instance/...) : les tests tournent
+donc dans un répertoire temporaire, sans jamais toucher aux bases du dépôt.
+"""
+
+import atexit
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+WORK_DIR = tempfile.mkdtemp(prefix='siports-tests-')
+os.chdir(WORK_DIR)
+os.makedirs('instance')
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+os.environ['DATABASE_URL'] = os.path.join('instance', 'siports_production.db')
+
+
+@pytest.fixture(scope='session')
+def table_sql():
+    """DDL d'une table telle que créée par init_database()"""
+    import server
+
+    def _table_sql(name: str) -> str:
+        with server.db_pool.connection() as conn:
+            return conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+            ).fetchone()[0]
+    return _table_sql
+
+
+@pytest.fixture
+def empty_db(tmp_path, table_sql):
+    """Base temporaire contenant les tables users et messages du serveur, vides"""
+    conn = sqlite3.connect(tmp_path / 'test.db')
+    conn.execute(table_sql('users'))
+    conn.execute(table_sql('messages'))
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope='session')
+def client():
+    """Client HTTP de l'application (événements startup/shutdown inclus)"""
+    import server
+    from fastapi.testclient import TestClient
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture(scope='session')
+def login(client):
+    """En-têtes d'authentification d'un compte de démonstration"""
+    def _login(email: str, password: str) -> dict:
+        response = client.post('/api/auth/login', json={'email': email, 'password': password})
+        assert response.status_code == 200, response.text
+        return {'Authorization': f"Bearer {response.json()['access_token']}"}
+    return _login
@@ -0,0 +1,177 @@
+"""Non-régression du matching IA : scores, ordre et égalités de find_matches figés
+
+Les résultats attendus ont été vérifiés contre le modèle de compatibilité
+d'origine (avant vectorisation NumPy) ; toute évolution du barème ou de la
+sélection doit les mettre à jour explicitement.
+"""
+
+import json
+import sqlite3
+
+import pytest
+from pydantic import ValidationError
+
+from ai_matching_service import AIMatchingService, MatchingRequest
+
+# id, user_type, secteurs, thématiques, localisation, objectifs, produits/services,
+# recherches, taille d'entreprise, disponibilité
+PROFILES = (
+    (1, 'visitor', ['port', 'logistique'], ['digitalization', 'green_energy'], ['Maroc'],
+     ['trouver partenaires logistique', 'solutions IoT capteurs'], [], ['Capteurs IoT', 'logistique'],
+     'SME', 'immédiat'),
+    (2, 'exhibitor', ['port'], ['digitalization'], ['Maroc', 'France'],
+     ['vendre'], ['Capteurs IoT', 'Logistique multimodale'], [],
+     'Enterprise', 'semaine prochaine'),
+    (3, 'partner', ['énergie'], ['green_energy'], ['France'],
+     ['financement'], ['Conseil financement'], ['partenaires'],
+     'startup', None),
+    (4, 'exhibitor', ['port', 'logistique'], ['digitalization', 'green_energy'], ['Maroc'],
+     ['trouver partenaires logistique'], ['Grues portuaires', 'logiciel'], ['Capteurs IoT'],
+     'SME', 'immédiat'),
+    (5, 'visitor', ['pêche'], ['regulations'], ['Sénégal'],
+     [], [], [],
+     None, None),
+    # Profil identique au 3 : égalités de score départagées par id
+    (6, 'partner', ['énergie'], ['green_energy'], ['France'],
+     ['financement'], ['Conseil financement'], ['partenaires'],
+     'startup', None),
+    (7, 'exhibitor', ['digital', 'sécurité'], ['digitalization'], ['Espagne'],
+     ['solutions IoT capteurs'], ['logiciel', 'Capteurs IoT'], ['logistique'],
+     'grande entreprise', ''),
+    (8, 'exhibitor', ['port'], ['port_management'], ['Maroc'],
+     ['acheter grues'], ['Grues portuaires'], ['Grues portuaires'],
+     'sme/enterprise', 'immédiat'),
+    # Profils quasi identiques et très complets : score plafonné à 100, potentiels élevés
+    (9, 'partner', ['port', 'logistique', 'énergie', 'digital'],
+     ['digitalization', 'green_energy', 'port_management', 'regulations'], ['Maroc'],
+     ['trouver partenaires logistique', 'acheter grues', 'solutions IoT capteurs', 'financement'],
+     ['Grues portuaires', 'Capteurs IoT', 'Logistique multimodale', 'Conseil financement', 'logiciel'],
+     ['Grues portuaires', 'Capteurs IoT'],
+     'SME', 'immédiat'),
+    (10, 'exhibitor', ['port', 'logistique', 'énergie', 'digital'],
+     ['digitalization', 'green_energy', 'port_management', 'regulations'], ['Maroc'],
+     ['trouver partenaires logistique', 'acheter grues', 'solutions IoT capteurs', 'financement'],
+     ['Grues portuaires', 'Capteurs IoT', 'Logistique multimodale', 'Conseil financement', 'logiciel'],
+     ['Capteurs IoT'],
+     'SME', 'immédiat'),
+)
+
+
+@pytest.fixture
+def service(tmp_path, table_sql):
+    """Service de matching sur une base temporaire peuplée avec PROFILES"""
+    db_path = str(tmp_path / 'matching.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute(table_sql('users'))
+    conn.commit()
+
+    service = AIMatchingService(db_path)
+
+    for (user_id, user_type, sectors, themes, locations, objectives, products, looking_for,
+         company_size, availability) in PROFILES:
+        conn.execute(
+            "INSERT INTO users (id, email, password_hash, user_type, status) VALUES (?, ?, 'x', ?, 'validated')",
+            (user_id, f"user{user_id}@example.com", user_type)
+        )
+        conn.execute(
+            '''INSERT INTO user_profiles_detailed
+               (user_id, sectors_activity, interest_themes, geographic_location, participation_objectives,
+                products_services, looking_for, company_size, meeting_availability)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            (user_id, json.dumps(sectors), json.dumps(themes), json.dumps(locations), json.dumps(objectives),
+             json.dumps(products), json.dumps(looking_for), company_size, availability)
+        )
+    conn.commit()
+    conn.close()
+    return service
+
+
+def matches(service, user_id, match_types=('all',), min_compatibility=0, limit=10):
+    """(id, score, potentiel) des matches, dans l'ordre renvoyé"""
+    request = MatchingRequest(
+        user_id=user_id, match_types=match_types, min_compatibility=min_compatibility, limit=limit
+    )
+    return [
+        (match.matched_user_id, match.compatibility_score, match.business_potential)
+        for match in service.find_matches(request)
+    ]
+
+
+@pytest.mark.parametrize('user_id, match_types, min_compatibility, limit, expected', [
+    # Égalités (9/10, 3/6) dans l'ordre des ids
+    (1, ('all',), 0, 10, [
+        (9, 72, 'Faible'), (10, 72, 'Faible'), (4, 64, 'Faible'), (2, 58, 'Faible'), (8, 45, 'Faible'),
+        (7, 19, 'Faible'), (3, 15, 'Faible'), (6, 15, 'Faible'), (5, 10, 'Faible'),
+    ]),
+    # Filtre sur les types d'utilisateur
+    (1, ('exhibitor', 'partner'), 0, 10, [
+        (9, 72, 'Faible'), (10, 72, 'Faible'), (4, 64, 'Faible'), (2, 58, 'Faible'), (8, 45, 'Faible'),
+        (7, 19, 'Faible'), (3, 15, 'Faible'), (6, 15, 'Faible'),
+    ]),
+    # Seuil de compatibilité
+    (1, ('all',), 40, 10, [
+        (9, 72, 'Faible'), (10, 72, 'Faible'), (4, 64, 'Faible'), (2, 58, 'Faible'), (8, 45, 'Faible'),
+    ]),
+    (4, ('all',), 0, 10, [
+        (9, 68, 'Faible'), (10, 68, 'Faible'), (1, 64, 'Faible'), (2, 54, 'Faible'), (8, 45, 'Faible'),
+        (3, 15, 'Faible'), (6, 15, 'Faible'), (7, 15, 'Faible'), (5, 10, 'Faible'),
+    ]),
+    # Scores nuls conservés avec un seuil à 0
+    (5, ('all',), 0, 10, [
+        (9, 15, 'Faible'), (10, 15, 'Faible'), (1, 10, 'Faible'), (4, 10, 'Faible'), (8, 10, 'Faible'),
+        (2, 0, 'Faible'), (3, 0, 'Faible'), (6, 0, 'Faible'), (7, 0, 'Faible'),
+    ]),
+    # Candidats limités aux limit * 2 premiers ids : le 6 (meilleur score) n'est pas examiné
+    (3, ('all',), 0, 2, [(2, 24, 'Faible'), (1, 15, 'Faible')]),
+    (4, ('all',), 0, 3, [(1, 64, 'Faible'), (2, 54, 'Faible'), (3, 15, 'Faible')]),
+    (7, ('all',), 0, 3, [(1, 15, 'Faible'), (4, 15, 'Faible'), (2, 9, 'Faible')]),
+    # Limite nulle ou négative : aucun match (pas d'erreur)
+    (1, ('all',), 0, 0, []),
+    (1, ('all',), 0, -2, []),
+    # Score plafonné à 100 et potentiel selon les besoins complémentaires
+    (9, ('all',), 0, 10, [
+        (10, 100, 'Très élevé'), (4, 68, 'Faible'), (1, 64, 'Faible'), (2, 58, 'Faible'), (8, 54, 'Faible'),
+        (3, 28, 'Faible'), (6, 28, 'Faible'), (7, 28, 'Faible'), (5, 15, 'Faible'),
+    ]),
+    (10, ('partner',), 0, 10, [(9, 100, 'Élevé'), (3, 28, 'Faible'), (6, 28, 'Faible')]),
+])
+def test_find_matches_is_stable(service, user_id, match_types, min_compatibility, limit, expected):
+    assert matches(service, user_id, match_types, min_compatibility, limit) == expected
+
+
+def test_find_matches_with_collaborative_filtering(service):
+    service.update_interaction_feedback_batch([
+        (1, 4, 'message', 1), (2, 4, 'message', 1), (3, 4, 'view', 1),
+        (2, 9, 'message', 1), (3, 9, 'message', 0),
+        (2, 10, 'view', 1), (3, 10, 'message', 1),
+    ])
+
+    assert matches(service, 1) == [
+        (10, 74, 'Faible'), (9, 73, 'Faible'), (4, 65, 'Faible'), (2, 58, 'Faible'), (8, 45, 'Faible'),
+        (7, 19, 'Faible'), (3, 15, 'Faible'), (6, 15, 'Faible'), (5, 10, 'Faible'),
+    ]
+    assert matches(service, 2) == [
+        (4, 52, 'Faible'), (1, 50, 'Faible'), (9, 50, 'Faible'), (10, 50, 'Faible'), (8, 45, 'Faible'),
+        (3, 24, 'Faible'), (6, 24, 'Faible'), (7, 5, 'Faible'), (5, 0, 'Faible'),
+    ]
+
+
+def test_match_types_are_deduplicated(service):
+    request = MatchingRequest(user_id=1, match_types=['partner', 'exhibitor', 'partner'] * 1000)
+    assert request.match_types == ('partner', 'exhibitor')
+    assert matches(service, 1, ['partner'] * 2000) == [(9, 72, 'Faible'), (3, 15, 'Faible'), (6, 15, 'Faible')]
+
+
+def test_unknown_match_types_are_rejected():
+    with pytest.raises(ValidationError):
+        MatchingRequest(user_id=1, match_types=['exhibitor', 'partners'])
+
+
+def test_unknown_user_has_no_matches(service):
+    assert matches(service, 999) == []
+
+
+def test_matches_carry_conversation_topics(service):
+    request = MatchingRequest(user_id=9, min_compatibility=0, limit=3)
+    for match in service.find_matches(request):
+        assert len(match.suggested_conversation_topics) >= 3
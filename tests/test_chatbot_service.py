@@ -0,0 +1,62 @@
+"""Génération partagée du chatbot : requêtes identiques coalescées, annulation du meneur"""
+
+import asyncio
+
+from chatbot_service import ChatRequest, SiportsAIService
+
+
+def test_waiter_regenerates_when_leader_is_cancelled():
+    chatbot = SiportsAIService(mock_mode=True)
+    request = ChatRequest(message="Programme du salon")
+    calls = []
+
+    async def generate(request, session_id):
+        calls.append(session_id)
+        await asyncio.sleep(0.05)
+        return f"Réponse {len(calls)}", True
+
+    chatbot._generate_uncached = generate
+
+    async def scenario():
+        leader = asyncio.create_task(chatbot.generate_text(request, 'meneur'))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(chatbot.generate_text(request, 'attente'))
+        await asyncio.sleep(0.01)
+
+        # Client du meneur déconnecté pendant la génération
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        return leader.cancelled(), await waiter
+
+    leader_cancelled, text = asyncio.run(scenario())
+
+    assert leader_cancelled
+    assert text == "Réponse 2"
+    assert calls == ['meneur', 'attente']
+    assert chatbot.inflight == {}
+
+
+def test_cancelled_waiter_does_not_cancel_leader():
+    chatbot = SiportsAIService(mock_mode=True)
+    request = ChatRequest(message="Programme du salon")
+
+    async def generate(request, session_id):
+        await asyncio.sleep(0.05)
+        return "Réponse", True
+
+    chatbot._generate_uncached = generate
+
+    async def scenario():
+        leader = asyncio.create_task(chatbot.generate_text(request, 'meneur'))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(chatbot.generate_text(request, 'attente'))
+        await asyncio.sleep(0.01)
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return waiter.cancelled(), await leader
+
+    waiter_cancelled, text = asyncio.run(scenario())
+
+    assert waiter_cancelled
+    assert text == "Réponse"
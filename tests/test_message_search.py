@@ -0,0 +1,179 @@
+"""Recherche dans les messages : portée utilisateur, FTS5, repli LIKE et index synchronisé"""
+
+import uuid
+
+import pytest
+
+import server
+
+
+def unique_word() -> str:
+    """Mot absent de tout autre message de la base partagée"""
+    return f"mot{uuid.uuid4().hex[:10]}"
+
+
+@pytest.fixture
+def users():
+    """Trois utilisateurs validés (alice, bob, carol) -> id"""
+    ids = {}
+    with server.db_pool.connection() as conn:
+        for name in ('alice', 'bob', 'carol'):
+            ids[name] = conn.execute(
+                "INSERT INTO users (email, password_hash, status, first_name, last_name) "
+                "VALUES (?, 'x', 'validated', ?, 'Test')",
+                (f"{name}-{uuid.uuid4().hex}@example.com", name.capitalize())
+            ).lastrowid
+        conn.commit()
+    return ids
+
+
+def send(sender_id: int, recipient_id: int, content: str) -> int:
+    """Insère un message avec la requête du serveur (déclenche les triggers)"""
+    with server.db_pool.connection() as conn:
+        message_id = conn.execute(
+            server.INSERT_MESSAGE_SQL, (sender_id, recipient_id, content, 'text')
+        ).lastrowid
+        conn.commit()
+        return message_id
+
+
+def found_ids(user_id: int, query: str) -> list:
+    return [message['id'] for message in server.search_messages(user_id, query)]
+
+
+@pytest.fixture
+def fts_enabled():
+    if not server.MESSAGES_FTS_ENABLED:
+        pytest.skip("SQLite compilé sans FTS5")
+
+
+@pytest.fixture(params=['fts', 'like'])
+def search_mode(request, monkeypatch):
+    """Exécute le test sur l'index FTS5 puis sur le repli LIKE"""
+    if request.param == 'fts' and not server.MESSAGES_FTS_ENABLED:
+        pytest.skip("SQLite compilé sans FTS5")
+    monkeypatch.setattr(server, 'MESSAGES_FTS_ENABLED', request.param == 'fts')
+    return request.param
+
+
+def test_search_is_scoped_to_the_user(users, search_mode):
+    word = unique_word()
+    alice_to_bob = send(users['alice'], users['bob'], f"Cargaison {word} au port")
+    carol_to_bob = send(users['carol'], users['bob'], f"Autre {word}")
+
+    assert found_ids(users['alice'], word) == [alice_to_bob]
+    assert found_ids(users['carol'], word) == [carol_to_bob]
+    assert sorted(found_ids(users['bob'], word)) == sorted([alice_to_bob, carol_to_bob])
+
+
+def test_search_builds_message_payload(users, search_mode):
+    word = unique_word()
+    message_id = send(users['alice'], users['bob'], f"Bonjour {word}")
+
+    [message] = server.search_messages(users['bob'], word)
+    assert message == {
+        "id": message_id,
+        "sender_id": users['alice'],
+        "recipient_id": users['bob'],
+        "content": f"Bonjour {word}",
+        "message_type": "text",
+        "is_read": False,
+        "created_at": message['created_at'],
+        "sender_name": "Alice Test",
+        "is_own_message": False
+    }
+    assert server.search_messages(users['alice'], word)[0]['is_own_message'] is True
+
+
+def test_blank_query_returns_nothing(users, search_mode):
+    send(users['alice'], users['bob'], unique_word())
+
+    assert server.search_messages(users['alice'], '   ') == []
+
+
+def test_fts_treats_user_input_as_words(users, fts_enabled):
+    word = unique_word()
+    message_id = send(users['alice'], users['bob'], f"Équipement {word} portuaire")
+
+    # Syntaxe FTS5 neutralisée, accents ignorés, mots dans n'importe quel ordre
+    assert found_ids(users['alice'], f'"{word}') == [message_id]
+    assert found_ids(users['alice'], f"portuaire equipement {word}") == [message_id]
+    assert found_ids(users['alice'], f"{word} OR absent") == []
+
+
+def test_like_fallback_matches_substrings(users, monkeypatch):
+    monkeypatch.setattr(server, 'MESSAGES_FTS_ENABLED', False)
+    word = unique_word()
+    message_id = send(users['alice'], users['bob'], f"prefixe{word}suffixe")
+
+    assert found_ids(users['alice'], word) == [message_id]
+
+
+def test_like_fallback_treats_wildcards_literally(users, monkeypatch):
+    monkeypatch.setattr(server, 'MESSAGES_FTS_ENABLED', False)
+    word = unique_word()
+    percent = send(users['alice'], users['bob'], f"{word} remise 100% garantie")
+    underscore = send(users['alice'], users['bob'], f"{word} fichier rapport_final")
+    backslash = send(users['alice'], users['bob'], f"{word} chemin C:\\docs")
+    send(users['alice'], users['bob'], f"{word} remise 1000 garantie rapportsfinal C:docs")
+
+    assert found_ids(users['alice'], f"{word} remise 100%") == [percent]
+    assert found_ids(users['alice'], "100% garantie") == [percent]
+    assert found_ids(users['alice'], "rapport_final") == [underscore]
+    assert found_ids(users['alice'], "C:\\docs") == [backslash]
+
+
+def test_fts_index_follows_insert_update_delete(users, fts_enabled):
+    old_word, new_word = unique_word(), unique_word()
+    message_id = send(users['alice'], users['bob'], f"Message {old_word}")
+    assert found_ids(users['alice'], old_word) == [message_id]
+
+    with server.db_pool.connection() as conn:
+        conn.execute("UPDATE messages SET content = ? WHERE id = ?", (f"Message {new_word}", message_id))
+        conn.commit()
+    assert found_ids(users['alice'], old_word) == []
+    assert found_ids(users['alice'], new_word) == [message_id]
+
+    with server.db_pool.connection() as conn:
+        conn.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+        conn.commit()
+    assert found_ids(users['alice'], new_word) == []
+
+
+def test_fts_index_is_backfilled_from_existing_messages(empty_db, fts_enabled):
+    empty_db.executemany(
+        "INSERT INTO messages (sender_id, recipient_id, content) VALUES (?, ?, ?)",
+        [(1, 2, "grue portuaire"), (2, 1, "logistique verte")]
+    )
+
+    assert server.init_messages_search(empty_db) is True
+    assert empty_db.execute(
+        "SELECT rowid FROM messages_fts WHERE messages_fts MATCH 'portuaire'"
+    ).fetchall() == [(1,)]
+
+    # Idempotent : un second appel ne réindexe pas
+    assert server.init_messages_search(empty_db) is True
+    assert empty_db.execute("SELECT COUNT(*) FROM messages_fts").fetchone()[0] == 2
+
+
+def test_search_endpoint(client, login):
+    admin = login('admin@siportevent.com', 'admin123')
+    visitor = login('visitor@example.com', 'visitor123')
+    visitor_id = client.get('/api/auth/verify', headers=visitor).json()['user']['id']
+    word = unique_word()
+
+    response = client.post(
+        '/api/messages/send', json={'recipient_id': visitor_id, 'content': f"Rendez-vous {word}"}, headers=admin
+    )
+    assert response.status_code == 200
+
+    [message] = client.get('/api/messages/search', params={'q': word}, headers=admin).json()['messages']
+    assert message['id'] == response.json()['message_id']
+    assert message['is_own_message'] is True
+    assert client.get('/api/messages/search', params={'q': word}, headers=visitor).json()['messages'][0]['is_own_message'] is False
+    assert client.get('/api/messages/search', params={'q': word}).status_code in (401, 403)
+
+    # Limite hors bornes ramenée à [1, 200] (LIMIT -1 renverrait tout)
+    send(visitor_id, visitor_id, f"Note {word}")
+    limited = client.get('/api/messages/search', params={'q': word, 'limit': -1}, headers=visitor).json()['messages']
+    assert len(limited) == 1
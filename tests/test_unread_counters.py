@@ -0,0 +1,100 @@
+"""Compteurs de non-lus (user_unread) : toujours égaux au COUNT(*) des messages non lus"""
+
+import pytest
+
+import server
+
+
+def assert_counters_match(conn):
+    expected = dict(conn.execute(
+        "SELECT recipient_id, COUNT(*) FROM messages WHERE is_read = FALSE GROUP BY recipient_id"
+    ).fetchall())
+    counters = dict(conn.execute("SELECT user_id, unread FROM user_unread").fetchall())
+
+    assert {user_id: unread for user_id, unread in counters.items() if unread} == expected
+    assert all(unread >= 0 for unread in counters.values())
+
+
+def send(conn, sender_id: int, recipient_id: int, content: str = "Bonjour") -> int:
+    message_id = conn.execute(
+        server.INSERT_MESSAGE_SQL, (sender_id, recipient_id, content, 'text')
+    ).lastrowid
+    conn.commit()
+    return message_id
+
+
+def read_conversation(conn, user_id: int, contact_id: int):
+    conn.execute(server.MARK_CONVERSATION_READ_SQL, (contact_id, user_id))
+    conn.commit()
+
+
+@pytest.fixture
+def conn(empty_db):
+    """Base temporaire dont les compteurs sont créés avant le premier message"""
+    server.init_unread_counters(empty_db)
+    return empty_db
+
+
+def test_counters_follow_send_read_and_delete(conn):
+    send(conn, 1, 2)
+    send(conn, 1, 2)
+    send(conn, 3, 2)
+    first_to_one = send(conn, 2, 1)
+    assert_counters_match(conn)
+
+    read_conversation(conn, 2, 1)
+    assert_counters_match(conn)
+
+    # Relire une conversation déjà lue ne décompte rien
+    read_conversation(conn, 2, 1)
+    assert_counters_match(conn)
+
+    conn.execute("DELETE FROM messages WHERE id = ?", (first_to_one,))
+    conn.execute("DELETE FROM messages WHERE sender_id = 3")
+    conn.commit()
+    assert_counters_match(conn)
+
+    # Suppression d'un message déjà lu, puis retour à l'état non lu
+    conn.execute("DELETE FROM messages WHERE sender_id = 1 AND id = (SELECT MIN(id) FROM messages)")
+    conn.execute("UPDATE messages SET is_read = FALSE WHERE sender_id = 1")
+    conn.commit()
+    assert_counters_match(conn)
+
+
+def test_counters_are_backfilled_from_existing_messages(empty_db):
+    for sender_id, recipient_id in ((1, 2), (1, 2), (3, 2), (2, 1), (2, 3)):
+        send(empty_db, sender_id, recipient_id)
+    read_conversation(empty_db, 3, 2)
+
+    server.init_unread_counters(empty_db)
+    assert_counters_match(empty_db)
+
+    # Idempotent, puis maintenu par les triggers
+    server.init_unread_counters(empty_db)
+    send(empty_db, 3, 1)
+    read_conversation(empty_db, 2, 1)
+    assert_counters_match(empty_db)
+
+
+def test_unread_count_endpoint_matches_messages(client, login):
+    admin = login('admin@siportevent.com', 'admin123')
+    visitor = login('visitor@example.com', 'visitor123')
+    admin_id = client.get('/api/auth/verify', headers=admin).json()['user']['id']
+    visitor_id = client.get('/api/auth/verify', headers=visitor).json()['user']['id']
+
+    def unread_count() -> int:
+        return client.get('/api/messages/unread/count', headers=visitor).json()['unread_count']
+
+    def expected_count() -> int:
+        return server.query_db(
+            "SELECT COUNT(*) FROM messages WHERE recipient_id = ? AND is_read = FALSE", (visitor_id,), one=True
+        )[0]
+
+    before = unread_count()
+    assert before == expected_count()
+
+    client.post('/api/messages/send', json={'recipient_id': visitor_id, 'content': "Nouveau"}, headers=admin)
+    assert unread_count() == before + 1 == expected_count()
+
+    client.get(f'/api/messages/conversation/{admin_id}', headers=visitor)
+    assert unread_count() == expected_count()